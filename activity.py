@@ -0,0 +1,44 @@
+"""Coalesced last-active tracking for the Student Meetup Bot.
+
+Every handled update marks its sender as active in memory, so nothing is
+written per message. The ``activity_flush`` maintenance job writes the
+pending marks to the storage backend in one batch every
+ACTIVITY_FLUSH_INTERVAL seconds (and once more on shutdown), keeping only
+the latest time per user. Discovery uses these times to skip users who
+haven't been around for ACTIVE_WINDOW_DAYS.
+"""
+
+from datetime import datetime, timedelta
+
+from config import ACTIVE_WINDOW_DAYS
+from storage import get_storage
+
+# telegram_id -> latest activity not written yet
+_pending: dict[int, datetime] = {}
+
+
+def touch(telegram_id: int):
+    """Mark a user as active now."""
+    _pending[telegram_id] = datetime.now()
+
+
+def active_since() -> datetime | None:
+    """Cutoff for "recently active" in discovery (None when the window is off)."""
+    if not ACTIVE_WINDOW_DAYS:
+        return None
+    return datetime.now() - timedelta(days=ACTIVE_WINDOW_DAYS)
+
+
+async def flush():
+    """Write all pending activity in one batch."""
+    global _pending
+    if not _pending:
+        return
+    batch, _pending = _pending, {}
+    try:
+        await get_storage().record_activity(batch)
+    except Exception:
+        # Keep the marks for the next flush; newer ones win
+        for telegram_id, active_at in batch.items():
+            _pending.setdefault(telegram_id, active_at)
+        raise
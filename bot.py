@@ -5,32 +5,60 @@ A bot for university students to create profiles and meet fellow students.
 """
 
 import logging
-from telegram import Update
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    MessageHandler,
-    ConversationHandler,
-    filters,
-)
 
-from config import BOT_TOKEN, PORT, WEBHOOK_URL
-import database as db
-from constants import (
-    HOMEPAGE, AWAITING_PHOTOS, AWAITING_UNIVERSITY, AWAITING_PROGRAM, AWAITING_BIO,
-    EDIT_MENU, EDIT_PHOTOS, EDIT_UNIVERSITY, EDIT_PROGRAM, EDIT_BIO, BROWSING,
-    BTN_DONE_PHOTOS, BTN_CANCEL_EDITING, BTN_LIKE, BTN_PASS, BTN_STOP_BROWSING,
-)
-from handlers import (
-    start_handler, homepage_handler, help_handler, cancel_handler,
-    receive_photo_handler, done_photos_handler,
-    receive_university_handler, receive_program_handler, receive_bio_handler,
-    edit_menu_handler,
-    edit_photos_handler, edit_photos_done_handler,
-    edit_university_handler, edit_program_handler, edit_bio_handler,
-    cancel_editing_handler,
-    start_browsing_handler, like_handler, pass_handler, stop_browsing_handler,
-)
+from startup import StartupProfile
+
+# Started before the heavy imports so they show up in the profile
+startup = StartupProfile()
+
+with startup.phase("config"):
+    from config import (
+        BOT_TOKEN, PORT, WEBHOOK_URL, STARTUP_PROFILE, CONCURRENT_UPDATES, STORAGE_BACKEND,
+        CANDIDATE_INDEX, CACHE_INVALIDATION, ACTIVITY_FLUSH_INTERVAL, RECORD_UPDATES,
+        TRACE_SAMPLE_RATE,
+    )
+    from constants import (
+        HOMEPAGE, AWAITING_PHOTOS, AWAITING_UNIVERSITY, AWAITING_PROGRAM, AWAITING_BIO,
+        EDIT_MENU, EDIT_PHOTOS, EDIT_UNIVERSITY, EDIT_PROGRAM, EDIT_BIO, BROWSING,
+        BTN_DONE_PHOTOS, BTN_CANCEL_EDITING, BTN_LIKE, BTN_PASS, BTN_STOP_BROWSING,
+    )
+startup.enabled = STARTUP_PROFILE
+
+with startup.phase("telegram"):
+    from telegram import Update
+    from telegram.ext import (
+        Application,
+        CommandHandler,
+        MessageHandler,
+        ConversationHandler,
+        TypeHandler,
+        filters,
+    )
+    from telegram.request import BaseRequest
+
+# Only what serving updates needs; broadcasts, trace exporters and the
+# update recorder are imported when first used, and the database modules
+# only for the Postgres backend (see build_application)
+with startup.phase("core"):
+    import activity
+    import shutdown
+    import tracing
+    from maintenance import MaintenanceScheduler
+    from storage import get_storage
+
+with startup.phase("handlers"):
+    from handlers import (
+        start_handler, homepage_handler, help_handler, cancel_handler,
+        receive_photo_handler, done_photos_handler,
+        receive_university_handler, receive_program_handler, receive_bio_handler,
+        edit_menu_handler,
+        edit_photos_handler, edit_photos_done_handler,
+        edit_university_handler, edit_program_handler, edit_bio_handler,
+        cancel_editing_handler,
+        start_browsing_handler, like_handler, pass_handler, stop_browsing_handler,
+        stats_handler, broadcast_handler,
+        commit_pending_edit_sessions,
+    )
 
 # Enable logging
 logging.basicConfig(
@@ -39,32 +67,82 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main() -> None:
-    """Start the bot."""
-    if not BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN environment variable not set!")
-        return
-    
-    # Database initialization and bot commands setup
+def build_application(token: str, request: BaseRequest | None = None) -> Application:
+    """Create the Application with all handlers and background jobs.
+
+    ``request`` replaces the Bot API transport; updates are then fed in by
+    the caller instead of an updater (see replay.py).
+    """
+    # Database initialization; anything not needed to serve updates is deferred
     async def post_init(application):
-        # Initialize database (if exists)
-        created = await db.init_db()
-        if created:
-            logger.info("Database tables created")
+        startup.mark("post_init")
+
+        # For Postgres: migration check and connection pool warm-up
+        migrated = await get_storage().init()
+        if migrated:
+            logger.info("Database schema migrated")
         else:
-            logger.info("Database tables already exist")
+            logger.info(f"Storage ready ({STORAGE_BACKEND})")
+        startup.mark("storage ready")
+        
+        if tracing_on:
+            # Exporter set up off the import path; nothing is traced before the first update
+            trace_exporter = tracing.configure()
+            scheduler.register("trace_export", trace_exporter.flush, interval=10)
+            shutdown.register_flush("traces", trace_exporter.flush)
         
+        # Commands persist on Telegram's side, so refreshing them can wait
+        # until polling or the webhook is up (the job queue starts after that)
+        application.job_queue.run_once(register_commands, when=0, name="register_commands")
+    
+    async def register_commands(context) -> None:
         # Set bot commands (shows in menu button)
         from telegram import BotCommand
         commands = [
             BotCommand("start", "Start the bot / Go to homepage"),
             BotCommand("help", "Show help message"),
         ]
-        await application.bot.set_my_commands(commands)
+        await context.bot.set_my_commands(commands)
         logger.info("Bot commands registered")
     
-    # Create application with post_init hook
-    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    # Runs ahead of all other handlers; only does work for the first update
+    first_update_seen = False
+    
+    async def on_first_update(update: Update, context) -> None:
+        nonlocal first_update_seen
+        if first_update_seen:
+            return
+        first_update_seen = True
+        startup.mark("first update")
+        startup.report()
+    
+    async def resume_broadcasts(context) -> None:
+        import broadcast
+        await broadcast.resume_broadcasts(context)
+    
+    # Runs ahead of everything else; activity is only written in batches
+    async def on_any_update(update: Update, context) -> None:
+        # Membership changes (e.g. blocking the bot) aren't activity
+        if update.effective_user is not None and update.my_chat_member is None:
+            activity.touch(update.effective_user.id)
+    
+    # Create application with startup and graceful shutdown hooks
+    builder = Application.builder().token(token)
+    tracing_on = TRACE_SAMPLE_RATE > 0
+    if request is not None:
+        builder = builder.request(request).updater(None)
+    elif tracing_on:
+        # Record a span per Bot API call
+        builder = builder.request(tracing.TracingRequest(connection_pool_size=256))
+    application = (
+        builder
+        .application_class(shutdown.DrainingApplication)
+        .concurrent_updates(shutdown.DrainingUpdateProcessor(CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_stop(shutdown.post_stop)
+        .post_shutdown(shutdown.post_shutdown)
+        .build()
+    )
     
     # Create conversation handler
     conv_handler = ConversationHandler(
@@ -115,9 +193,72 @@ def main() -> None:
         fallbacks=[CommandHandler("cancel", cancel_handler), CommandHandler("start", start_handler)],
     )
     
+    # Background maintenance jobs (intervals in seconds)
+    scheduler = MaintenanceScheduler(application)
+    if STORAGE_BACKEND == "postgres":
+        # SQLAlchemy and asyncpg are only loaded for this backend
+        with startup.phase("database"):
+            import database as db
+            import stats
+        scheduler.register("stats_rollup", stats.refresh_stats, interval=300, jitter=30)
+        scheduler.register("prune_caches", db.prune_caches, interval=600, jitter=60)
+        # Also covers startup (init_db leaves partitions alone); serialized across
+        # workers by an advisory lock
+        scheduler.register(
+            "likes_partitions", db.maintain_likes_partitions,
+            interval=6 * 3600, jitter=600, first=60,
+        )
+        scheduler.register("analyze", db.analyze_tables, interval=6 * 3600, jitter=600)
+        if CANDIDATE_INDEX:
+            # First load right after startup, off the startup path; later runs
+            # pick up profiles created by other workers or bulk imports
+            if CACHE_INVALIDATION:
+                import invalidation
+                # Waits for the LISTEN, so no change falls between it and the load
+                load_index = invalidation.load_candidate_index
+            else:
+                load_index = db.load_candidate_index
+            scheduler.register("candidate_index", load_index, interval=600, jitter=60, first=0)
+    scheduler.register("activity_flush", activity.flush, interval=ACTIVITY_FLUSH_INTERVAL, jitter=5)
+    shutdown.register_flush("activity", activity.flush)
+    # Profile edits are staged in user_data until the user goes back home
+    shutdown.register_flush("edit_sessions", lambda: commit_pending_edit_sessions(application))
+    application.bot_data["maintenance"] = scheduler
+    
     # Add handlers
+    if RECORD_UPDATES:
+        from recorder import UpdateRecorder
+        update_recorder = UpdateRecorder(RECORD_UPDATES)
+        scheduler.register("recording_flush", update_recorder.flush, interval=10)
+        shutdown.register_flush("recording", update_recorder.close)
+        
+        async def record_update(update: Update, context) -> None:
+            update_recorder.record(update)
+        
+        application.add_handler(TypeHandler(Update, record_update), group=-3)
+    application.add_handler(TypeHandler(Update, on_any_update), group=-2)
+    application.add_handler(TypeHandler(Update, on_first_update), group=-1)
     application.add_handler(conv_handler)
     application.add_handler(CommandHandler("help", help_handler))
+    if STORAGE_BACKEND == "postgres":
+        # Statistics and broadcast progress live in Postgres
+        application.add_handler(CommandHandler("stats", stats_handler))
+        application.add_handler(CommandHandler("broadcast", broadcast_handler))
+        # Pick up broadcasts interrupted by a restart, or left by a worker that died
+        application.job_queue.run_repeating(
+            resume_broadcasts, interval=60, first=10, name="broadcast:resume"
+        )
+    
+    return application
+
+
+def main() -> None:
+    """Start the bot."""
+    if not BOT_TOKEN:
+        logger.error("TELEGRAM_BOT_TOKEN environment variable not set!")
+        return
+    
+    application = build_application(BOT_TOKEN)
     
     # Start the bot
     logger.info("Starting bot...")
@@ -0,0 +1,403 @@
+"""Admin broadcasts for the Student Meetup Bot.
+
+A broadcast sends one text message to every user who hasn't blocked the
+bot. Recipients are streamed in ``telegram_id`` order from a server-side
+cursor, one bounded window at a time, so memory stays flat and no read
+transaction stays open for the whole run.
+
+Each batch of recipients is claimed in ``broadcast_deliveries`` (and
+committed) before anything is sent, so a broadcast resumed after a crash
+never messages anyone twice: only unclaimed recipients are picked up again.
+A claim whose outcome was lost mid-send stays ``pending`` and is not retried.
+
+Only one worker sends a given broadcast: the sender holds a session-level
+advisory lock on it for the whole run, and workers that find it taken leave
+the broadcast alone. Every worker retries resume_broadcasts periodically, so
+if the sending worker dies, another one takes over.
+
+Messages go out from BROADCAST_CONCURRENCY concurrent senders sharing a
+BROADCAST_RATE messages/second budget, kept below Telegram's bot-wide
+limit so interactive replies still get through; sending also pauses while
+the bot is busy (see maintenance.is_busy). Users for whom Telegram reports
+the bot as blocked get ``users.blocked_at`` set and are left out of later
+broadcasts, until they are active again (they must have unblocked it).
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextlib import aclosing, asynccontextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    Table, Column, Integer, BigInteger, Text, DateTime, ForeignKey,
+    select, update, delete, exists, func, or_,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+from telegram.ext import Application, ContextTypes
+
+import database as db
+import locks
+from config import BROADCAST_RATE, BROADCAST_CONCURRENCY
+from maintenance import is_busy
+
+logger = logging.getLogger(__name__)
+
+# Recipients claimed and sent per batch, and per cursor window
+_BATCH_SIZE = 500
+_WINDOW_SIZE = 2_000
+# Attempts per recipient (flood waits and connection errors are retried)
+_MAX_ATTEMPTS = 3
+# How often paused senders re-check for load or shutdown
+_BACKOFF = 1.0
+
+# Broadcast statuses
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+
+# Delivery statuses; "pending" means claimed, outcome not recorded yet
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+broadcasts = Table(
+    "broadcasts",
+    db.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("text", Text, nullable=False),
+    Column("created_by", BigInteger),
+    Column("status", Text, nullable=False, default=RUNNING),
+    Column("sent", BigInteger, nullable=False, default=0),
+    Column("failed", BigInteger, nullable=False, default=0),
+    Column("blocked", BigInteger, nullable=False, default=0),
+    Column("created_at", DateTime, default=datetime.now),
+    Column("finished_at", DateTime),
+)
+
+broadcast_deliveries = Table(
+    "broadcast_deliveries",
+    db.metadata,
+    Column("broadcast_id", Integer, ForeignKey("broadcasts.id"), primary_key=True),
+    Column("telegram_id", BigInteger, primary_key=True),
+    Column("status", Text, nullable=False),
+)
+
+# Not blocked, or active since the block was recorded
+_reachable = or_(
+    db.users.c.blocked_at.is_(None),
+    db.users.c.last_active_at > db.users.c.blocked_at,
+)
+
+# broadcast id -> sender working on it in this process
+_senders: dict[int, "_Sender"] = {}
+
+
+class _Sender:
+    """Sends one broadcast's messages under a shared rate budget."""
+
+    def __init__(self, application: Application, text: str):
+        self.application = application
+        self.text = text
+        self.interval = 1 / BROADCAST_RATE
+        self.cancelled = False
+        self._next_send = 0.0  # monotonic
+        self._semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+    @property
+    def stopping(self) -> bool:
+        return self.cancelled or not self.application.running
+
+    async def _wait_turn(self) -> bool:
+        """Wait for a send slot; False if the broadcast is stopping instead."""
+        while is_busy(self.application):
+            if self.stopping:
+                return False
+            await asyncio.sleep(_BACKOFF)
+
+        # Re-checked after every sleep, so a _pause meanwhile is honored
+        while True:
+            if self.stopping:
+                return False
+            now = time.monotonic()
+            delay = self._next_send - now
+            if delay <= 0:
+                self._next_send = now + self.interval
+                return True
+            await asyncio.sleep(min(delay, _BACKOFF))
+
+    def _pause(self, retry_after: int | timedelta):
+        """Hold all senders back after a flood-control error."""
+        seconds = retry_after.total_seconds() if isinstance(retry_after, timedelta) else retry_after
+        self._next_send = max(self._next_send, time.monotonic() + seconds)
+
+    async def send(self, telegram_id: int) -> str | None:
+        """Deliver to one user; None if nothing was attempted (stopping)."""
+        async with self._semaphore:
+            for _ in range(_MAX_ATTEMPTS):
+                if not await self._wait_turn():
+                    return None
+                try:
+                    await self.application.bot.send_message(telegram_id, self.text)
+                    return SENT
+                except RetryAfter as e:
+                    self._pause(e.retry_after)
+                except Forbidden:
+                    # Blocked the bot or deleted their account
+                    return BLOCKED
+                except BadRequest:
+                    return FAILED
+                except TimedOut:
+                    # May have been delivered; retrying could double-send
+                    return FAILED
+                except NetworkError:
+                    # Request never reached Telegram
+                    pass
+            return FAILED
+
+
+async def _recipient_batches(broadcast_id: int):
+    """Yield batches of unclaimed recipient IDs, in ``telegram_id`` order."""
+    engine = db.get_engine()
+    claimed = exists().where(
+        broadcast_deliveries.c.broadcast_id == broadcast_id,
+        broadcast_deliveries.c.telegram_id == db.users.c.telegram_id,
+    )
+    after = 0
+    while True:
+        stmt = (
+            select(db.users.c.telegram_id)
+            .where(
+                db.users.c.telegram_id > after,
+                _reachable,
+                ~claimed,
+            )
+            .order_by(db.users.c.telegram_id)
+            .limit(_WINDOW_SIZE)
+            .execution_options(yield_per=_BATCH_SIZE)
+        )
+        count = 0
+        async with engine.connect() as conn:
+            result = await conn.stream(stmt)
+            async for partition in result.partitions():
+                batch = [row.telegram_id for row in partition]
+                count += len(batch)
+                after = batch[-1]
+                yield batch
+        if count < _WINDOW_SIZE:
+            return
+
+
+async def _claim(broadcast_id: int, batch: list[int]) -> list[int] | None:
+    """Claim recipients not claimed yet; None if the broadcast isn't running."""
+    async with db.get_engine().begin() as conn:
+        result = await conn.execute(
+            select(broadcasts.c.status).where(broadcasts.c.id == broadcast_id)
+        )
+        if result.scalar_one_or_none() != RUNNING:
+            return None
+        result = await conn.execute(
+            pg_insert(broadcast_deliveries)
+            .values([
+                {"broadcast_id": broadcast_id, "telegram_id": telegram_id, "status": PENDING}
+                for telegram_id in batch
+            ])
+            .on_conflict_do_nothing()
+            .returning(broadcast_deliveries.c.telegram_id)
+        )
+        return [row.telegram_id for row in result.fetchall()]
+
+
+async def _record(broadcast_id: int, claimed: list[int], outcomes: list[str | None]):
+    """Store delivery outcomes; claims that were never attempted are released."""
+    by_status = defaultdict(list)
+    for telegram_id, outcome in zip(claimed, outcomes):
+        by_status[outcome].append(telegram_id)
+
+    deliveries = broadcast_deliveries.c
+    async with db.get_engine().begin() as conn:
+        if by_status[None]:
+            await conn.execute(delete(broadcast_deliveries).where(
+                deliveries.broadcast_id == broadcast_id,
+                deliveries.telegram_id.in_(by_status[None]),
+            ))
+        for status in (SENT, FAILED, BLOCKED):
+            if by_status[status]:
+                await conn.execute(
+                    update(broadcast_deliveries)
+                    .where(
+                        deliveries.broadcast_id == broadcast_id,
+                        deliveries.telegram_id.in_(by_status[status]),
+                    )
+                    .values(status=status)
+                )
+        if by_status[BLOCKED]:
+            await conn.execute(
+                update(db.users)
+                .where(db.users.c.telegram_id.in_(by_status[BLOCKED]))
+                # Not a profile change, so keep updated_at as it is
+                .values(blocked_at=datetime.now(), updated_at=db.users.c.updated_at)
+            )
+        await conn.execute(
+            update(broadcasts)
+            .where(broadcasts.c.id == broadcast_id)
+            .values(
+                sent=broadcasts.c.sent + len(by_status[SENT]),
+                failed=broadcasts.c.failed + len(by_status[FAILED]),
+                blocked=broadcasts.c.blocked + len(by_status[BLOCKED]),
+            )
+        )
+
+
+@asynccontextmanager
+async def _sender_lock(broadcast_id: int):
+    """Hold the broadcast's advisory lock; yields False if another worker has it."""
+    async with db.get_engine().connect() as conn:
+        result = await conn.execute(
+            select(func.pg_try_advisory_lock(locks.BROADCASTS, broadcast_id))
+        )
+        acquired = result.scalar_one()
+        # The lock outlives the transaction; don't sit idle in one while sending
+        await conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                # Closing the session releases the lock even if the connection
+                # broke; back in the pool it would keep holding it
+                await conn.invalidate()
+
+
+async def _run(broadcast_id: int, sender: _Sender):
+    async with _sender_lock(broadcast_id) as acquired:
+        if not acquired:
+            logger.debug(f"Broadcast {broadcast_id} is being sent by another worker")
+            return
+        await _send_all(broadcast_id, sender)
+
+
+async def _send_all(broadcast_id: int, sender: _Sender):
+    async with aclosing(_recipient_batches(broadcast_id)) as batches:
+        async for batch in batches:
+            claimed = await _claim(broadcast_id, batch)
+            if claimed is None:
+                logger.info(f"Broadcast {broadcast_id} cancelled")
+                return
+            outcomes = await asyncio.gather(*(sender.send(telegram_id) for telegram_id in claimed))
+            await _record(broadcast_id, claimed, outcomes)
+            if sender.cancelled:
+                logger.info(f"Broadcast {broadcast_id} cancelled")
+                return
+            if sender.stopping:
+                logger.info(f"Broadcast {broadcast_id} stopped; it resumes on the next start")
+                return
+
+    async with db.get_engine().begin() as conn:
+        await conn.execute(
+            update(broadcasts)
+            .where(broadcasts.c.id == broadcast_id, broadcasts.c.status == RUNNING)
+            .values(status=DONE, finished_at=datetime.now())
+        )
+    logger.info(f"Broadcast {broadcast_id} finished")
+
+
+def _start_task(application: Application, broadcast_id: int, text: str):
+    sender = _Sender(application, text)
+
+    async def run():
+        try:
+            await _run(broadcast_id, sender)
+        except Exception:
+            logger.exception(f"Broadcast {broadcast_id} failed; it resumes on the next start")
+        finally:
+            _senders.pop(broadcast_id, None)
+
+    _senders[broadcast_id] = sender
+    application.create_task(run(), name=f"broadcast:{broadcast_id}")
+
+
+async def start_broadcast(application: Application, text: str, created_by: int) -> int | None:
+    """Create a broadcast and start sending it in the background.
+
+    Returns:
+        The broadcast ID, or None if another broadcast is still running.
+    """
+    async with db.get_engine().begin() as conn:
+        result = await conn.execute(
+            select(broadcasts.c.id).where(broadcasts.c.status == RUNNING).limit(1)
+        )
+        if result.scalar_one_or_none() is not None:
+            return None
+        result = await conn.execute(
+            pg_insert(broadcasts)
+            .values(text=text, created_by=created_by)
+            .returning(broadcasts.c.id)
+        )
+        broadcast_id = result.scalar_one()
+
+    _start_task(application, broadcast_id, text)
+    logger.info(f"Broadcast {broadcast_id} started by {created_by}")
+    return broadcast_id
+
+
+async def cancel_broadcast() -> int | None:
+    """Cancel the running broadcast (in every worker); returns its ID."""
+    async with db.get_engine().begin() as conn:
+        result = await conn.execute(
+            update(broadcasts)
+            .where(broadcasts.c.status == RUNNING)
+            .values(status=CANCELLED, finished_at=datetime.now())
+            .returning(broadcasts.c.id)
+        )
+        cancelled = [row.id for row in result.fetchall()]
+
+    for broadcast_id in cancelled:
+        sender = _senders.get(broadcast_id)
+        if sender is not None:
+            sender.cancelled = True
+    return cancelled[0] if cancelled else None
+
+
+async def get_latest_broadcast() -> dict | None:
+    """Progress of the most recent broadcast."""
+    async with db.get_engine().connect() as conn:
+        result = await conn.execute(
+            select(broadcasts).order_by(broadcasts.c.id.desc()).limit(1)
+        )
+        row = result.fetchone()
+        if row is None:
+            return None
+        result = await conn.execute(
+            select(func.count())
+            .select_from(db.users)
+            .where(_reachable)
+        )
+        recipients = result.scalar_one()
+
+    return {
+        "id": row.id,
+        "status": row.status,
+        "sent": row.sent,
+        "failed": row.failed,
+        "blocked": row.blocked,
+        "recipients": recipients,
+        "created_at": row.created_at,
+        "finished_at": row.finished_at,
+    }
+
+
+async def resume_broadcasts(context: ContextTypes.DEFAULT_TYPE):
+    """Job callback: pick up broadcasts no worker is sending (e.g. after a restart)."""
+    async with db.get_engine().connect() as conn:
+        result = await conn.execute(
+            select(broadcasts.c.id, broadcasts.c.text).where(broadcasts.c.status == RUNNING)
+        )
+        rows = result.fetchall()
+
+    for row in rows:
+        if row.id not in _senders:
+            logger.info(f"Resuming broadcast {row.id}")
+            _start_task(context.application, row.id, row.text)
@@ -0,0 +1,326 @@
+"""Bulk import/export of users and likes for the Student Meetup Bot.
+
+Streams tables to and from CSV or JSONL files (gzip-compressed when the
+name ends in ``.gz``) using Postgres COPY through the engine's asyncpg
+connection, so memory use stays flat regardless of table size.
+
+Imports run in batches. Each batch commits together with its progress
+row in ``bulk_import_progress``, so an interrupted import can simply be
+started again and continues after the last committed batch.
+
+Usage:
+    python bulk.py export users users.csv.gz
+    python bulk.py export likes likes.jsonl.gz
+    python bulk.py import users users.csv.gz
+    python bulk.py import likes likes.csv.gz [--batch-rows 200000] [--restart]
+
+Import users before likes (likes reference users), into empty tables.
+Pass partitions are created for the months the imported likes cover, as
+batches reveal older passes, and the usage rollups (stats.py) are recounted
+after every import, since the imported rows predate the rollup watermark.
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime
+
+import database as db
+import stats
+
+logger = logging.getLogger(__name__)
+
+# Columns moved per table; likes ids are regenerated on import
+TABLES = {
+    "users": db.users,
+    "likes": db.likes,
+}
+_SKIP_COLUMNS = {"likes": {"id"}}
+
+# Export chunk size for JSONL cursors and progress reporting interval
+_PREFETCH_ROWS = 10_000
+_PROGRESS_EVERY = 5.0  # seconds
+
+# Explicit NULL marker, so NULL and empty strings survive re-batching on import
+_CSV_NULL = "\\N"
+# How COPY ... CSV (and hand-made files) spell false
+_CSV_FALSE = frozenset({"f", "false", "False", "0"})
+
+
+def _columns(table_name: str) -> list[str]:
+    table = TABLES[table_name]
+    return [c.name for c in table.columns if c.name not in _SKIP_COLUMNS.get(table_name, ())]
+
+
+def _open(path: str, mode: str):
+    """Open a file, transparently gzip-compressed if it ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _file_format(path: str) -> str:
+    name = path.removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(".jsonl"):
+        return "jsonl"
+    raise SystemExit(f"Unsupported file type: {path} (use .csv, .jsonl, optionally .gz)")
+
+
+class _Progress:
+    """Logs throughput at most every few seconds."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.rows = 0
+        self.bytes = 0
+        self._start = time.monotonic()
+        self._last = self._start
+
+    def add(self, rows: int = 0, nbytes: int = 0):
+        self.rows += rows
+        self.bytes += nbytes
+        now = time.monotonic()
+        if now - self._last >= _PROGRESS_EVERY:
+            self._last = now
+            self.log()
+
+    def log(self, done: bool = False):
+        elapsed = max(time.monotonic() - self._start, 1e-9)
+        rows = f"{self.rows:,} rows, " if self.rows else ""
+        logger.info(
+            f"{self.label}: {'done, ' if done else ''}{rows}"
+            f"{self.bytes / 1e6:,.1f} MB in {elapsed:,.0f}s "
+            f"({self.bytes / 1e6 / elapsed:,.1f} MB/s)"
+        )
+
+
+async def _raw_connection(conn):
+    """Get the asyncpg connection behind a SQLAlchemy async connection."""
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+
+# --- Export ---
+
+async def export_table(table_name: str, path: str):
+    """Stream a table into a CSV or JSONL file."""
+    columns = _columns(table_name)
+    column_list = ", ".join(columns)
+    progress = _Progress(f"export {table_name}")
+
+    async with db.get_engine().connect() as conn:
+        apg = await _raw_connection(conn)
+
+        if _file_format(path) == "csv":
+            with _open(path, "wb") as out:
+                async def sink(chunk: bytes):
+                    out.write(chunk)
+                    progress.add(nbytes=len(chunk))
+
+                await apg.copy_from_query(
+                    f"SELECT {column_list} FROM {table_name}",
+                    output=sink,
+                    format="csv",
+                    header=True,
+                    null=_CSV_NULL,
+                )
+        else:
+            with _open(path, "wt") as out:
+                # Server-side cursor; only one prefetch batch is held in memory
+                async with apg.transaction():
+                    cursor = apg.cursor(
+                        f"SELECT {column_list} FROM {table_name}",
+                        prefetch=_PREFETCH_ROWS,
+                    )
+                    async for record in cursor:
+                        line = json.dumps(dict(record), default=_json_default) + "\n"
+                        out.write(line)
+                        progress.add(rows=1, nbytes=len(line))
+
+    progress.log(done=True)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+# --- Import ---
+
+def _csv_batches(path: str, table_name: str, batch_rows: int, skip: int):
+    """Yield (row_count, csv_bytes, oldest pass month) batches, skipping imported rows.
+
+    The month (``YYYY-MM``, or None) is only tracked for likes.
+    """
+    with _open(path, "rt") as src:
+        reader = csv.reader(src)
+        header = next(reader, None) or []
+        track = table_name == "likes" and {"is_like", "created_at"} <= set(header)
+        if track:
+            like_at, created_at = header.index("is_like"), header.index("created_at")
+        for _ in range(skip):
+            if next(reader, None) is None:
+                return
+        while True:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            count = 0
+            oldest = None
+            for row in reader:
+                writer.writerow(row)
+                count += 1
+                # ISO timestamps sort as strings; only the month matters
+                if track and row[like_at] in _CSV_FALSE:
+                    month = row[created_at][:7]
+                    if month and month != _CSV_NULL and (oldest is None or month < oldest):
+                        oldest = month
+                if count >= batch_rows:
+                    break
+            if not count:
+                return
+            yield count, buffer.getvalue().encode(), oldest
+
+
+def _jsonl_batches(path: str, table_name: str, batch_rows: int, skip: int):
+    """Yield (row_count, records, oldest pass month) batches, skipping imported rows."""
+    columns = _columns(table_name)
+    datetime_columns = {
+        c.name for c in TABLES[table_name].columns if isinstance(c.type, DateTime)
+    }
+    track = table_name == "likes"
+    with _open(path, "rt") as src:
+        for _ in range(skip):
+            if not src.readline():
+                return
+        batch = []
+        oldest = None
+        for line in src:
+            data = json.loads(line)
+            for name in datetime_columns:
+                if data.get(name):
+                    data[name] = datetime.fromisoformat(data[name])
+            batch.append(tuple(data.get(name) for name in columns))
+            if track and data.get("is_like") is False and data.get("created_at"):
+                month = f"{data['created_at']:%Y-%m}"
+                if oldest is None or month < oldest:
+                    oldest = month
+            if len(batch) >= batch_rows:
+                yield len(batch), batch, oldest
+                batch = []
+                oldest = None
+        if batch:
+            yield len(batch), batch, oldest
+
+
+async def import_table(table_name: str, path: str, batch_rows: int, restart: bool = False):
+    """Load a CSV or JSONL file into a table, resuming after the last committed batch."""
+    columns = _columns(table_name)
+    file_format = _file_format(path)
+    source = f"{table_name}:{os.path.abspath(path)}"
+    progress = _Progress(f"import {table_name}")
+
+    # Oldest month with pass partitions ensured during this run
+    partitions_from = None
+
+    async with db.get_engine().connect() as conn:
+        apg = await _raw_connection(conn)
+
+        if restart:
+            await apg.execute("DELETE FROM bulk_import_progress WHERE source = $1", source)
+        done = await apg.fetchval(
+            "SELECT rows_done FROM bulk_import_progress WHERE source = $1", source
+        ) or 0
+        if done:
+            logger.info(f"Resuming {source} after {done:,} rows")
+
+        if file_format == "csv":
+            batches = _csv_batches(path, table_name, batch_rows, skip=done)
+        else:
+            batches = _jsonl_batches(path, table_name, batch_rows, skip=done)
+
+        for count, payload, oldest_pass in batches:
+            if oldest_pass is not None and (
+                partitions_from is None or oldest_pass < partitions_from
+            ):
+                # Otherwise historical passes land in likes_pass_default,
+                # which expire_old_passes can only trim with a DELETE
+                async with db.get_engine().begin() as ddl:
+                    await db.ensure_likes_partitions(
+                        ddl, since=datetime.strptime(oldest_pass, "%Y-%m")
+                    )
+                partitions_from = oldest_pass
+                logger.info(f"Pass partitions ready from {oldest_pass}")
+
+            # The batch and its progress row commit together
+            async with apg.transaction():
+                if file_format == "csv":
+                    await apg.copy_to_table(
+                        table_name,
+                        source=io.BytesIO(payload),
+                        columns=columns,
+                        format="csv",
+                        null=_CSV_NULL,
+                    )
+                else:
+                    await apg.copy_records_to_table(
+                        table_name, records=payload, columns=columns
+                    )
+                done += count
+                await apg.execute(
+                    "INSERT INTO bulk_import_progress (source, rows_done, updated_at) "
+                    "VALUES ($1, $2, now()) "
+                    "ON CONFLICT (source) DO UPDATE "
+                    "SET rows_done = EXCLUDED.rows_done, updated_at = EXCLUDED.updated_at",
+                    source, done,
+                )
+            progress.add(rows=count, nbytes=len(payload) if file_format == "csv" else 0)
+
+    progress.log(done=True)
+
+
+def main() -> None:
+    """Parse arguments and run an export or import."""
+    parser = argparse.ArgumentParser(description="Bulk import/export of users and likes")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help="File path (.csv or .jsonl, optionally .gz)")
+    parser.add_argument("--batch-rows", type=int, default=200_000,
+                        help="Rows per committed import batch")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore saved progress and import from the beginning")
+    args = parser.parse_args()
+    _file_format(args.path)
+
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+    )
+
+    async def run():
+        try:
+            await db.init_db()
+            if args.action == "export":
+                await export_table(args.table, args.path)
+            else:
+                await import_table(args.table, args.path, args.batch_rows, args.restart)
+                # Imported rows are older than the rollup watermark
+                logger.info("Recounting usage statistics")
+                await stats.rebuild_stats()
+        finally:
+            await db.dispose_engines()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
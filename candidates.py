@@ -0,0 +1,181 @@
+"""In-memory candidate index for discovery.
+
+Every profile ID is kept in a NumPy array, with its last-active time
+alongside, so picking a candidate
+doesn't scan ``users``: a random sample is drawn and the user's seen IDs
+are masked out in one vectorized pass. Profiles created through
+save_profile are added as they are written; a periodic rebuild picks up
+the ones created elsewhere (other workers, bulk imports) and refreshes
+activity recorded by other workers. Profiles added while a rebuild's query
+runs are carried over into the rebuilt index.
+
+Each user's seen IDs are loaded from ``likes`` once and then kept up to
+date by record_interaction, in a bounded LRU cache. Entries are reloaded
+after CANDIDATE_SEEN_TTL seconds so swipes served by other workers show up.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import datetime
+
+import numpy as np
+
+from config import CANDIDATE_SEEN_TTL
+
+# IDs drawn per pick before falling back to masking the whole index
+_SAMPLE_SIZE = 64
+# Initial capacity of the index arrays (doubled as profiles are added)
+_MIN_CAPACITY = 1024
+
+# Maximum number of users whose seen IDs are kept in memory
+SEEN_CACHE_SIZE = 5000
+
+_rng = np.random.default_rng()
+
+
+def _timestamp(moment: datetime | None) -> float:
+    return moment.timestamp() if moment is not None else 0.0
+
+
+class CandidateIndex:
+    """Profile IDs and last-active times, in growable NumPy arrays."""
+
+    def __init__(self):
+        self.ready = False
+        self._ids = np.empty(0, dtype=np.int64)
+        self._active = np.empty(0, dtype=np.float64)  # Epoch seconds
+        self._size = 0
+        self._positions: dict[int, int] = {}
+        # Rebuilds in progress, and profiles added since the oldest one started
+        self._loading = 0
+        self._added_while_loading: set[int] = set()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def begin_load(self):
+        """Start a rebuild: profiles added from now on survive the next load()."""
+        self._loading += 1
+
+    def end_load(self):
+        """Finish a rebuild started with begin_load (whether it loaded or failed)."""
+        self._loading -= 1
+        if not self._loading:
+            self._added_while_loading.clear()
+
+    def load(self, rows: Iterable[tuple[int, datetime | None]]):
+        """Replace the index with ``(telegram_id, last_active_at)`` rows.
+
+        Profiles added since begin_load are kept, since ``rows`` may predate them.
+        """
+        rows = list(rows)
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        active = np.fromiter((_timestamp(row[1]) for row in rows), dtype=np.float64, count=len(rows))
+        # Swapped in together, so lookups never see a half-built index
+        self._ids, self._active, self._size = ids, active, len(rows)
+        self._positions = dict(zip(ids.tolist(), range(len(rows))))
+        for telegram_id in list(self._added_while_loading):
+            self._add(telegram_id)
+        self.ready = True
+
+    def add(self, telegram_id: int):
+        """Add a new profile (active now); indexed profiles are left as they are."""
+        if self._loading:
+            self._added_while_loading.add(telegram_id)
+        self._add(telegram_id)
+
+    def _add(self, telegram_id: int):
+        if telegram_id in self._positions:
+            return
+
+        if self._size == len(self._ids):
+            capacity = max(_MIN_CAPACITY, 2 * len(self._ids))
+            ids = np.empty(capacity, dtype=np.int64)
+            active = np.empty(capacity, dtype=np.float64)
+            ids[:self._size] = self._ids[:self._size]
+            active[:self._size] = self._active[:self._size]
+            self._ids, self._active = ids, active
+
+        self._ids[self._size] = telegram_id
+        self._active[self._size] = time.time()
+        self._positions[telegram_id] = self._size
+        self._size += 1
+
+    def touch(self, activity: dict[int, datetime]):
+        """Update last-active times of indexed profiles."""
+        for telegram_id, active_at in activity.items():
+            position = self._positions.get(telegram_id)
+            if position is not None:
+                self._active[position] = max(self._active[position], active_at.timestamp())
+
+    def sample(self, exclude: np.ndarray, active_since: datetime | None = None) -> int | None:
+        """Pick a random ID not in ``exclude``.
+
+        Optionally limited to profiles active since ``active_since``.
+        Returns None if every candidate is excluded.
+        """
+        ids = self._ids[:self._size]
+        if active_since is not None:
+            ids = ids[self._active[:self._size] >= active_since.timestamp()]
+        if not len(ids):
+            return None
+
+        # The first unseen ID among uniform draws is uniform over the unseen ones
+        picks = ids[_rng.integers(0, len(ids), _SAMPLE_SIZE)]
+        picks = picks[~np.isin(picks, exclude)]
+        if not len(picks):
+            # Most candidates are seen; mask the whole index instead
+            picks = ids[~np.isin(ids, exclude)]
+            if not len(picks):
+                return None
+            return int(picks[_rng.integers(0, len(picks))])
+        return int(picks[0])
+
+
+class SeenCache:
+    """Per-user arrays of IDs to exclude from discovery, in an LRU cache."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # user_id -> (monotonic load time, IDs)
+        self._entries: OrderedDict[int, tuple[float, np.ndarray]] = OrderedDict()
+
+    def get(self, user_id: int) -> np.ndarray | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    def put(self, user_id: int, ids: Iterable[int]) -> np.ndarray:
+        seen = np.fromiter(ids, dtype=np.int64)
+        self._entries[user_id] = (time.monotonic(), seen)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return seen
+
+    def add(self, user_id: int, target_id: int):
+        """Record a new interaction for a cached user."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            self._entries[user_id] = (entry[0], np.append(entry[1], target_id))
+
+    def prune(self):
+        """Drop expired entries."""
+        now = time.monotonic()
+        for user_id, (loaded_at, _) in list(self._entries.items()):
+            if now - loaded_at >= self.ttl:
+                del self._entries[user_id]
+
+    def clear(self):
+        self._entries.clear()
+
+
+index = CandidateIndex()
+seen = SeenCache(SEEN_CACHE_SIZE, CANDIDATE_SEEN_TTL)
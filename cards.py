@@ -0,0 +1,125 @@
+"""Profile card rendering for the Student Meetup Bot.
+
+Browsing and "View My Profile" show the same card: a Markdown caption plus
+up to MAX_PHOTOS photos. Cards are rendered once per profile version and
+kept in a bounded LRU cache keyed by (telegram_id, updated_at), so an edit
+naturally produces a fresh card and old versions age out.
+"""
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+from telegram import InputMediaPhoto, ReplyKeyboardMarkup, Update
+from telegram.ext import ContextTypes
+
+# Send strategies
+SEND_TEXT = "text"
+SEND_PHOTO = "photo"
+SEND_ALBUM = "album"
+
+# Maximum number of rendered cards kept in memory
+CARD_CACHE_SIZE = 2048
+
+
+class ProfileCard(NamedTuple):
+    """A ready-to-send profile card."""
+    caption: str
+    photos: tuple[str, ...]
+    media: tuple[InputMediaPhoto, ...]  # Prebuilt album, only for SEND_ALBUM
+    strategy: str
+
+
+_cache: OrderedDict[tuple, ProfileCard] = OrderedDict()
+
+
+def _render(profile: dict, own: bool, recycled: bool) -> ProfileCard:
+    """Build a card from a profile dict."""
+    caption = (
+        f"🏫 *University:* {profile['university'] or 'Not set'}\n"
+        f"📚 *Program:* {profile['program'] or 'Not set'}\n"
+        f"📝 *About:* {profile['bio'] or 'Not set'}"
+    )
+    if own:
+        caption = "👤 *Your Profile*\n\n" + caption
+    if recycled:
+        caption = "🔁 *You passed on this profile before*\n\n" + caption
+
+    photos = tuple(profile["photos"] or ())
+    if not photos:
+        caption += "\n📷 *Photos:* None uploaded" if own else "\n📷 *Photos:* None"
+        return ProfileCard(caption, photos, (), SEND_TEXT)
+    if len(photos) == 1:
+        return ProfileCard(caption, photos, (), SEND_PHOTO)
+
+    media = (
+        InputMediaPhoto(media=photos[0], caption=caption, parse_mode="Markdown"),
+        *(InputMediaPhoto(file_id) for file_id in photos[1:]),
+    )
+    return ProfileCard(caption, photos, media, SEND_ALBUM)
+
+
+def render_profile_card(profile: dict, own: bool = False) -> ProfileCard:
+    """Get the card for a profile, rendering it only if this version isn't cached.
+
+    Args:
+        profile: Profile dict as returned by the database layer.
+        own: Render the "Your Profile" variant shown to the profile's owner.
+    """
+    recycled = bool(profile.get("recycled"))
+    key = (profile["telegram_id"], profile.get("updated_at"), own, recycled)
+
+    card = _cache.get(key)
+    if card is not None:
+        _cache.move_to_end(key)
+        return card
+
+    card = _render(profile, own, recycled)
+    _cache[key] = card
+    if len(_cache) > CARD_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return card
+
+
+def evict(telegram_id: int):
+    """Drop every cached card of a profile."""
+    for key in [key for key in _cache if key[0] == telegram_id]:
+        del _cache[key]
+
+
+def clear():
+    """Drop all cached cards."""
+    _cache.clear()
+
+
+async def send_profile_card(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    card: ProfileCard,
+    reply_markup: ReplyKeyboardMarkup,
+    album_prompt: str,
+):
+    """Send a card to the current chat.
+
+    Albums can't carry a reply keyboard, so they are followed by
+    ``album_prompt`` with the keyboard attached.
+    """
+    if card.strategy == SEND_PHOTO:
+        await context.bot.send_photo(
+            chat_id=update.effective_chat.id,
+            photo=card.photos[0],
+            caption=card.caption,
+            parse_mode="Markdown",
+            reply_markup=reply_markup,
+        )
+    elif card.strategy == SEND_ALBUM:
+        await context.bot.send_media_group(
+            chat_id=update.effective_chat.id,
+            media=card.media,
+        )
+        await update.message.reply_text(album_prompt, reply_markup=reply_markup)
+    else:
+        await update.message.reply_text(
+            card.caption,
+            reply_markup=reply_markup,
+            parse_mode="Markdown",
+        )
@@ -1,14 +1,31 @@
 """Database operations for the Student Meetup Bot using SQLAlchemy."""
 
-from datetime import datetime
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
 from sqlalchemy import (
     MetaData, Table, Column, BigInteger, Text, DateTime, Boolean, Integer,
-    ForeignKey, select, update, insert, ARRAY, inspect
+    ForeignKey, Index, select, insert, text, ARRAY, func, exists,
+    or_, literal_column,
 )
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
-from config import DATABASE_URL
+import activity
+import candidates
+import locks
+import tracing
+from config import (
+    DATABASE_URL, DATABASE_REPLICA_URL, READ_YOUR_WRITES_WINDOW, PASS_RETENTION_DAYS,
+    RECYCLE_AFTER_DAYS, POOL_EXHAUSTED_TTL, CANDIDATE_INDEX, CACHE_INVALIDATION,
+)
+
+logger = logging.getLogger(__name__)
 
 # SQLAlchemy Setup
+# The schema itself is created and evolved by migrations.py; keep these
+# table definitions in sync with the latest migration.
 metadata = MetaData()
 
 # Users table with photos as array
@@ -22,21 +39,50 @@ users = Table(
     Column("photos", ARRAY(Text)),
     Column("created_at", DateTime, default=datetime.now),
     Column("updated_at", DateTime, default=datetime.now, onupdate=datetime.now),
+    Column("blocked_at", DateTime),  # Set when a broadcast finds the bot blocked
+    Column("last_active_at", DateTime, default=datetime.now),  # See activity.py
+    Index("ix_users_created_at", "created_at"),
+    Index("ix_users_last_active_at", "last_active_at"),
 )
 
-# Likes table to track user interactions
+# Likes table to track user interactions.
+# Partitioned by is_like: likes live in "likes_like", passes in "likes_pass",
+# which is further range-partitioned by month of created_at so old passes can
+# be expired by dropping whole partitions (see expire_old_passes).
+# Partition keys must be part of the primary key.
+# Trade-off: lookups by user_id still probe every partition (through each
+# one's ix_likes_user_seen), i.e. likes_like plus one per retained month;
+# HASH(user_id) partitioning would prune those, but then passes could no
+# longer be expired by dropping whole partitions.
 likes = Table(
     "likes",
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("user_id", BigInteger, ForeignKey("users.telegram_id"), nullable=False),
     Column("target_user_id", BigInteger, ForeignKey("users.telegram_id"), nullable=False),
-    Column("is_like", Boolean, nullable=False),  # True = like, False = pass
-    Column("created_at", DateTime, default=datetime.now),
+    Column("is_like", Boolean, primary_key=True),  # True = like, False = pass
+    Column("created_at", DateTime, primary_key=True, default=datetime.now),
+    # Covers the seen-set, mutual-like and recycled-pass lookups
+    Index("ix_likes_user_seen", "user_id", "target_user_id", "created_at"),
+    Index("ix_likes_created_at", "created_at"),
+    postgresql_partition_by="LIST (is_like)",
 )
 
+# NOTIFY channel for profile changes (see invalidation.py)
+PROFILE_CHANGES_CHANNEL = "profile_changes"
+
+# How many monthly pass partitions to keep created ahead of time
+_PASS_PARTITIONS_AHEAD = 2
+
 # Lazy engine initialization to avoid event loop issues
 _engine: AsyncEngine | None = None
+_replica_engine: AsyncEngine | None = None
+
+# telegram_id -> monotonic time of that user's last write (read-your-writes)
+_recent_writes: dict[int, float] = {}
+
+# telegram_id -> monotonic time until which that user has nothing left to see
+_pool_exhausted_until: dict[int, float] = {}
 
 
 def get_engine() -> AsyncEngine:
@@ -50,32 +96,316 @@ def get_engine() -> AsyncEngine:
             max_overflow=10,
             pool_pre_ping=True,
         )
+        tracing.instrument_engine(_engine)
     return _engine
 
 
+def get_replica_engine() -> AsyncEngine:
+    """Get or create the read-replica engine.
+
+    Falls back to the primary engine when no replica is configured.
+    """
+    global _replica_engine
+    if not DATABASE_REPLICA_URL:
+        return get_engine()
+    if _replica_engine is None:
+        _replica_engine = create_async_engine(
+            DATABASE_REPLICA_URL,
+            echo=False,
+            pool_size=5,
+            max_overflow=10,
+            pool_pre_ping=True,
+        )
+        tracing.instrument_engine(_replica_engine)
+    return _replica_engine
+
+
+async def dispose_engines():
+    """Close all pooled connections (primary and replica)."""
+    global _engine, _replica_engine
+    for engine in (_engine, _replica_engine):
+        if engine is not None:
+            await engine.dispose()
+    _engine = None
+    _replica_engine = None
+
+
+async def warm_pool(connections: int = 2):
+    """Open a few pooled connections up front (primary and replica).
+
+    Runs alongside the migration check at startup so the first updates
+    don't pay for the TCP/TLS/auth handshake.
+    """
+    async def _checkout(engine: AsyncEngine):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    engines = {get_engine(), get_replica_engine()}
+    await asyncio.gather(*(_checkout(e) for e in engines for _ in range(connections)))
+
+
+def _mark_write(telegram_id: int):
+    """Remember that a user just wrote, so their next reads hit the primary."""
+    if DATABASE_REPLICA_URL:
+        _recent_writes[telegram_id] = time.monotonic()
+
+
+def get_read_engine(telegram_id: int | None = None) -> AsyncEngine:
+    """Pick the engine for a read-only query issued on behalf of a user.
+
+    Reads go to the replica unless the user wrote within the
+    read-your-writes window, in which case they stay on the primary.
+    """
+    if not DATABASE_REPLICA_URL:
+        return get_engine()
+    if telegram_id is not None:
+        written_at = _recent_writes.get(telegram_id)
+        if written_at is not None:
+            if time.monotonic() - written_at < READ_YOUR_WRITES_WINDOW:
+                return get_engine()
+            del _recent_writes[telegram_id]
+    return get_replica_engine()
+
+
+def _month_start(moment: datetime) -> datetime:
+    """Return midnight on the first day of the month containing ``moment``."""
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month: datetime) -> datetime:
+    """Return the first day of the month after ``month``."""
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _pass_partition_name(month: datetime) -> str:
+    """Name of the pass partition holding ``month`` (e.g. likes_pass_p202610)."""
+    return f"likes_pass_p{month:%Y%m}"
+
+
+async def _lock_partitions(conn):
+    """Serialize partition DDL across workers until the transaction ends.
+
+    Without it, two workers expiring passes at once would both try to
+    detach and drop the same partition.
+    """
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:id)"), {"id": locks.LIKES_PARTITIONS}
+    )
+
+
+async def ensure_likes_partitions(conn, since: datetime | None = None):
+    """Create the like/pass partitions of ``likes`` that don't exist yet.
+
+    Monthly pass partitions are created from ``since`` (default: this month)
+    up to a couple of months ahead, so inserts never land in the default
+    partition during normal operation. Holds the partition lock until
+    ``conn``'s transaction ends.
+    """
+    await _lock_partitions(conn)
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS likes_like "
+        "PARTITION OF likes FOR VALUES IN (true)"
+    ))
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS likes_pass "
+        "PARTITION OF likes FOR VALUES IN (false) PARTITION BY RANGE (created_at)"
+    ))
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS likes_pass_default PARTITION OF likes_pass DEFAULT"
+    ))
+
+    month = _month_start(since or datetime.now())
+    last = _month_start(datetime.now())
+    for _ in range(_PASS_PARTITIONS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        upper = _next_month(month)
+        await _create_pass_partition(conn, month, upper)
+        month = upper
+
+
+async def _create_pass_partition(conn, month: datetime, upper: datetime):
+    """Create one monthly pass partition, moving in rows parked in the default one.
+
+    CREATE TABLE ... PARTITION OF fails if likes_pass_default already holds
+    rows in the new range (e.g. upkeep didn't run for a few months), so
+    those are moved into a plain table which is then attached instead.
+    """
+    name = _pass_partition_name(month)
+    result = await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})
+    if result.scalar_one_or_none() is not None:
+        return
+
+    bounds = {"lower": month, "upper": upper}
+    bounds_sql = f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+    result = await conn.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM likes_pass_default "
+            "WHERE created_at >= :lower AND created_at < :upper)"
+        ),
+        bounds,
+    )
+    if not result.scalar_one():
+        await conn.execute(text(f"CREATE TABLE {name} PARTITION OF likes_pass {bounds_sql}"))
+        return
+
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE likes_pass INCLUDING DEFAULTS)"))
+    result = await conn.execute(
+        text(
+            f"WITH moved AS ("
+            f"DELETE FROM likes_pass_default "
+            f"WHERE created_at >= :lower AND created_at < :upper RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    await conn.execute(text(f"ALTER TABLE likes_pass ATTACH PARTITION {name} {bounds_sql}"))
+    logger.warning(f"Moved {result.rowcount} pass(es) from likes_pass_default into {name}")
+
+
 async def init_db() -> bool:
-    """Initialize the database and create tables if they don't exist.
-    
+    """Initialize the database by applying any pending schema migrations.
+
+    Partition upkeep is left to the ``likes_partitions`` maintenance job,
+    so a current schema costs one version read at startup.
+
     Returns:
-        True if tables were created, False if they already existed.
+        True if the schema was changed, False if it was already current.
     """
+    from migrations import migrate
+
+    applied = await migrate(get_engine())
+    return bool(applied)
+
+
+async def maintain_likes_partitions():
+    """Expire old passes (if retention is on) and create upcoming partitions."""
+    if PASS_RETENTION_DAYS:
+        # Also keeps partitions created for the months ahead
+        await expire_old_passes(PASS_RETENTION_DAYS)
+    else:
+        async with get_engine().begin() as conn:
+            await ensure_likes_partitions(conn)
+
+
+async def analyze_tables():
+    """Refresh planner statistics on the hot tables."""
     engine = get_engine()
-    async with engine.begin() as conn:
-        # Check if table exists before creating
-        tables_before = await conn.run_sync(
-            lambda sync_conn: inspect(sync_conn).get_table_names()
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE users"))
+        await conn.execute(text("ANALYZE likes"))
+
+
+async def load_candidate_index():
+    """(Re)build the in-memory candidate index from ``users``.
+
+    Read from the primary, since a lagging replica would drop recent
+    profiles until the next rebuild; profiles added while the query runs
+    are kept too.
+    """
+    candidates.index.begin_load()
+    try:
+        async with get_engine().connect() as conn:
+            result = await conn.execute(
+                select(users.c.telegram_id, users.c.last_active_at)
+            )
+            rows = result.fetchall()
+        candidates.index.load(rows)
+    finally:
+        candidates.index.end_load()
+    logger.debug(f"Candidate index loaded: {len(candidates.index)} profiles")
+
+
+def reset_pool_exhausted():
+    """Forget all "nothing left to see" markers (a profile was added or changed)."""
+    _pool_exhausted_until.clear()
+
+
+async def record_activity(activity_times: dict[int, datetime]):
+    """Store last-active times for many users in one UPDATE.
+
+    Rows are only moved forward, and ``updated_at`` is left alone (this is
+    not a profile change).
+    """
+    async with get_engine().begin() as conn:
+        await conn.execute(
+            text(
+                "UPDATE users SET last_active_at = a.active_at "
+                "FROM unnest(CAST(:ids AS BIGINT[]), CAST(:times AS TIMESTAMP[])) "
+                "AS a(telegram_id, active_at) "
+                "WHERE users.telegram_id = a.telegram_id "
+                "AND (users.last_active_at IS NULL OR users.last_active_at < a.active_at)"
+            ),
+            {"ids": list(activity_times), "times": list(activity_times.values())},
         )
-        existed = "users" in tables_before
-        
-        # create_all is idempotent - only creates if not exists
-        await conn.run_sync(metadata.create_all)
-        
-        return not existed
+    candidates.index.touch(activity_times)
+
+
+async def prune_caches():
+    """Drop expired read-your-writes, pool-exhausted and seen-set entries."""
+    candidates.seen.prune()
+    now = time.monotonic()
+    for telegram_id, written_at in list(_recent_writes.items()):
+        if now - written_at >= READ_YOUR_WRITES_WINDOW:
+            del _recent_writes[telegram_id]
+    for telegram_id, until in list(_pool_exhausted_until.items()):
+        if now >= until:
+            del _pool_exhausted_until[telegram_id]
 
 
-async def get_profile(telegram_id: int) -> dict | None:
-    """Get a user's profile by their Telegram ID."""
+async def expire_old_passes(retention_days: int) -> int:
+    """Expire passes older than ``retention_days`` by dropping whole partitions.
+
+    A monthly partition is dropped once all of its rows are past the
+    cutoff, so passes live between ``retention_days`` and about a month
+    longer. Likes are never touched.
+
+    Returns:
+        The number of partitions dropped.
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
     engine = get_engine()
+    dropped = 0
+    async with engine.begin() as conn:
+        # Another worker may be expiring the same partitions
+        await _lock_partitions(conn)
+        result = await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'likes_pass' AND c.relname LIKE 'likes\\_pass\\_p%'"
+        ))
+        for (name,) in result.fetchall():
+            month = datetime.strptime(name.removeprefix("likes_pass_p"), "%Y%m")
+            if _next_month(month) > cutoff:
+                continue
+            await conn.execute(text(f"ALTER TABLE likes_pass DETACH PARTITION {name}"))
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped += 1
+
+        # Anything that slipped into the default partition is small; trim it directly
+        await conn.execute(
+            text("DELETE FROM likes_pass_default WHERE created_at < :cutoff"),
+            {"cutoff": cutoff},
+        )
+
+        # Keep partitions available for the months ahead
+        await ensure_likes_partitions(conn)
+
+    if dropped:
+        # Cached seen sets still include the expired passes
+        candidates.seen.clear()
+        logger.info(f"Expired {dropped} pass partition(s) older than {cutoff:%Y-%m-%d}")
+    return dropped
+
+
+async def get_profile(telegram_id: int, primary: bool = False) -> dict | None:
+    """Get a user's profile by their Telegram ID.
+
+    Reads from the replica unless ``primary`` is set (or the user just wrote).
+    """
+    engine = get_engine() if primary else get_read_engine(telegram_id)
     async with engine.connect() as conn:
         stmt = select(users).where(users.c.telegram_id == telegram_id)
         result = await conn.execute(stmt)
@@ -101,8 +431,18 @@ async def save_profile(
     program: str | None = None,
     bio: str | None = None,
     photos: list[str] | None = None,
-):
-    """Save or update a user's profile."""
+    expected_updated_at: datetime | None = None,
+) -> bool:
+    """Save or update a user's profile in a single upsert.
+
+    Args:
+        expected_updated_at: If given, an existing profile is only updated
+            when its ``updated_at`` still matches (optimistic concurrency).
+
+    Returns:
+        False if the profile changed since ``expected_updated_at``,
+        True otherwise.
+    """
     engine = get_engine()
     values = {}
     if university is not None:
@@ -114,31 +454,53 @@ async def save_profile(
     if photos is not None:
         values["photos"] = photos
 
+    stmt = pg_insert(users).values(
+        telegram_id=telegram_id,
+        university=university,
+        program=program,
+        bio=bio,
+        photos=photos or [],
+    )
+    if values:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[users.c.telegram_id],
+            set_={**values, "updated_at": datetime.now()},
+            where=(
+                users.c.updated_at.is_not_distinct_from(expected_updated_at)
+                if expected_updated_at is not None else None
+            ),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[users.c.telegram_id])
+
     async with engine.begin() as conn:
-        # Check if user exists
-        stmt_check = select(users.c.telegram_id).where(users.c.telegram_id == telegram_id)
-        result = await conn.execute(stmt_check)
-        exists = result.scalar_one_or_none()
-
-        if exists:
-            if values:
-                values["updated_at"] = datetime.now()
-                stmt_update = (
-                    update(users)
-                    .where(users.c.telegram_id == telegram_id)
-                    .values(**values)
-                )
-                await conn.execute(stmt_update)
-        else:
-            insert_values = {
-                "telegram_id": telegram_id,
-                "university": university,
-                "program": program,
-                "bio": bio,
-                "photos": photos or [],
-            }
-            stmt_insert = insert(users).values(**insert_values)
-            await conn.execute(stmt_insert)
+        result = await conn.execute(stmt.returning(
+            users.c.updated_at,
+            # xmax is 0 only for a freshly inserted row
+            literal_column("xmax = 0").label("inserted"),
+        ))
+        row = result.fetchone()
+        # Only new profiles change the candidate index
+        reindex = row is not None and row.inserted
+        if row is not None and CACHE_INVALIDATION:
+            # Delivered to the other workers only if this transaction commits
+            # Fixed size: user text could push it past NOTIFY's 8000-byte
+            # limit, which would fail (and roll back) the save
+            change = {"id": telegram_id, "at": row.updated_at.isoformat(), "reindex": reindex}
+            await conn.execute(select(func.pg_notify(
+                PROFILE_CHANGES_CHANNEL, json.dumps(change, separators=(",", ":"))
+            )))
+
+    if row is None:
+        # Nothing to change, or the optimistic check failed
+        return not (values and expected_updated_at is not None)
+
+    if reindex:
+        candidates.index.add(telegram_id)
+    _mark_write(telegram_id)
+    # A new or updated profile may be something an exhausted user can see again
+    reset_pool_exhausted()
+    return True
 
 
 async def save_photos(telegram_id: int, photo_file_ids: list[str]):
@@ -148,7 +510,7 @@ async def save_photos(telegram_id: int, photo_file_ids: list[str]):
 
 async def profile_exists(telegram_id: int) -> bool:
     """Check if a user has a profile."""
-    engine = get_engine()
+    engine = get_read_engine(telegram_id)
     async with engine.connect() as conn:
         stmt = select(users.c.telegram_id).where(users.c.telegram_id == telegram_id)
         result = await conn.execute(stmt)
@@ -161,27 +523,33 @@ async def get_next_profile(telegram_id: int) -> dict | None:
     Returns a random profile that:
     - Is not the user's own profile
     - Has not been liked or passed by this user
+    - Was active within ACTIVE_WINDOW_DAYS (see activity.py)
+
+    Once nothing unseen is left, falls back to a recycled pass (see
+    _get_recycled_profile); such profiles have ``recycled`` set to True.
+    If both come up empty, the user is remembered as exhausted for
+    POOL_EXHAUSTED_TTL seconds and lookups return None without a query.
     """
-    engine = get_engine()
+    exhausted_until = _pool_exhausted_until.get(telegram_id)
+    if exhausted_until is not None:
+        if time.monotonic() < exhausted_until:
+            return None
+        del _pool_exhausted_until[telegram_id]
+
+    engine = get_read_engine(telegram_id)
     async with engine.connect() as conn:
-        # Get IDs of users this person has already interacted with
-        seen_stmt = select(likes.c.target_user_id).where(likes.c.user_id == telegram_id)
-        seen_result = await conn.execute(seen_stmt)
-        seen_ids = [row[0] for row in seen_result.fetchall()]
-        seen_ids.append(telegram_id)  # Exclude own profile
-        
-        # Get a random unseen profile
-        from sqlalchemy.sql.expression import func
-        stmt = (
-            select(users)
-            .where(users.c.telegram_id.notin_(seen_ids))
-            .order_by(func.random())
-            .limit(1)
-        )
-        result = await conn.execute(stmt)
-        row = result.fetchone()
+        if CANDIDATE_INDEX and candidates.index.ready:
+            row = await _get_indexed_profile(conn, telegram_id)
+        else:
+            row = await _get_unseen_profile(conn, telegram_id)
+        recycled = False
+
+        if not row:
+            row = await _get_recycled_profile(conn, telegram_id)
+            recycled = True
         
         if not row:
+            _pool_exhausted_until[telegram_id] = time.monotonic() + POOL_EXHAUSTED_TTL
             return None
         
         return {
@@ -190,9 +558,111 @@ async def get_next_profile(telegram_id: int) -> dict | None:
             "program": row.program,
             "bio": row.bio,
             "photos": row.photos or [],
+            "updated_at": row.updated_at,
+            "recycled": recycled,
         }
 
 
+async def _get_unseen_profile(conn, telegram_id: int):
+    """Pick a random unseen profile in SQL (used until the index is loaded)."""
+    # Get IDs of users this person has already interacted with
+    seen_stmt = select(likes.c.target_user_id).where(likes.c.user_id == telegram_id)
+    seen_result = await conn.execute(seen_stmt)
+    seen_ids = [row[0] for row in seen_result.fetchall()]
+    seen_ids.append(telegram_id)  # Exclude own profile
+
+    # Get a random unseen profile
+    stmt = (
+        select(users)
+        .where(users.c.telegram_id.notin_(seen_ids))
+        .order_by(func.random())
+        .limit(1)
+    )
+    since = activity.active_since()
+    if since is not None:
+        # Served by ix_users_last_active_at when the window is selective
+        stmt = stmt.where(users.c.last_active_at >= since)
+    result = await conn.execute(stmt)
+    return result.fetchone()
+
+
+async def _get_indexed_profile(conn, telegram_id: int):
+    """Pick a random unseen profile from the in-memory candidate index.
+
+    Only the user's seen set (on a cache miss) and the chosen profile are
+    read from the database. An indexed profile missing from ``conn`` (a
+    lagging replica) is read from the primary; one missing there too falls
+    back to the SQL pick, so a stale index entry never looks like an empty
+    pool.
+    """
+    seen = candidates.seen.get(telegram_id)
+    if seen is None:
+        seen_stmt = select(likes.c.target_user_id).where(likes.c.user_id == telegram_id)
+        seen_result = await conn.execute(seen_stmt)
+        # Exclude own profile too
+        seen = candidates.seen.put(telegram_id, [telegram_id, *seen_result.scalars()])
+
+    target_id = candidates.index.sample(seen, active_since=activity.active_since())
+    if target_id is None:
+        return None
+    stmt = select(users).where(users.c.telegram_id == target_id)
+    result = await conn.execute(stmt)
+    row = result.fetchone()
+    if row is None and conn.engine is not get_engine():
+        # The index is built from the primary; the replica may not have it yet
+        async with get_engine().connect() as primary:
+            result = await primary.execute(stmt)
+            row = result.fetchone()
+    if row is None:
+        logger.warning(f"Indexed profile {target_id} not found; picking in SQL instead")
+        return await _get_unseen_profile(conn, telegram_id)
+    return row
+
+
+async def _get_recycled_profile(conn, telegram_id: int):
+    """Pick a previously passed profile worth showing again.
+
+    A pass qualifies once the profile was updated after the user's latest
+    pass on it, or the pass is older than RECYCLE_AFTER_DAYS. Updated
+    profiles come first, then the ones passed longest ago. Profiles the
+    user ever liked never come back.
+    """
+    cutoff = datetime.now() - timedelta(days=RECYCLE_AFTER_DAYS)
+
+    # Only the pass partitions are scanned, through ix_likes_user_seen
+    passes = (
+        select(
+            likes.c.target_user_id,
+            func.max(likes.c.created_at).label("last_seen"),
+        )
+        .where(likes.c.user_id == telegram_id, likes.c.is_like == False)
+        .group_by(likes.c.target_user_id)
+        .subquery()
+    )
+    liked = exists().where(
+        likes.c.user_id == telegram_id,
+        likes.c.target_user_id == passes.c.target_user_id,
+        likes.c.is_like == True,
+    )
+    updated_since = users.c.updated_at > passes.c.last_seen
+
+    stmt = (
+        select(users)
+        .join(passes, users.c.telegram_id == passes.c.target_user_id)
+        .where(
+            ~liked,
+            or_(updated_since, passes.c.last_seen < cutoff),
+        )
+        .order_by(updated_since.desc(), passes.c.last_seen)
+        .limit(1)
+    )
+    since = activity.active_since()
+    if since is not None:
+        stmt = stmt.where(users.c.last_active_at >= since)
+    result = await conn.execute(stmt)
+    return result.fetchone()
+
+
 async def record_interaction(user_id: int, target_user_id: int, is_like: bool):
     """Record a like or pass interaction."""
     engine = get_engine()
@@ -204,6 +674,10 @@ async def record_interaction(user_id: int, target_user_id: int, is_like: bool):
         )
         await conn.execute(stmt)
 
+    candidates.seen.add(user_id, target_user_id)
+    # The next discovery read must already exclude this target
+    _mark_write(user_id)
+
 
 async def check_mutual_like(user_id: int, target_user_id: int) -> bool:
     """Check if there's a mutual like between two users."""
@@ -9,11 +9,12 @@ from handlers.edit_profile import (
     edit_menu_handler,
     edit_photos_handler, edit_photos_done_handler,
     edit_university_handler, edit_program_handler, edit_bio_handler,
-    cancel_editing_handler,
+    cancel_editing_handler, commit_pending_edit_sessions,
 )
 from handlers.browse import (
     start_browsing_handler, like_handler, pass_handler, stop_browsing_handler,
 )
+from handlers.admin import stats_handler, broadcast_handler
 
 __all__ = [
     # Start handlers
@@ -25,7 +26,9 @@ __all__ = [
     "edit_menu_handler",
     "edit_photos_handler", "edit_photos_done_handler",
     "edit_university_handler", "edit_program_handler", "edit_bio_handler",
-    "cancel_editing_handler",
+    "cancel_editing_handler", "commit_pending_edit_sessions",
     # Browse handlers
     "start_browsing_handler", "like_handler", "pass_handler", "stop_browsing_handler",
+    # Admin handlers
+    "stats_handler", "broadcast_handler",
 ]
@@ -0,0 +1,107 @@
+"""Admin-only command handlers."""
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+
+from config import ADMIN_IDS
+
+
+def is_admin(update: Update) -> bool:
+    """Check whether the update comes from a configured admin."""
+    return update.effective_user is not None and update.effective_user.id in ADMIN_IDS
+
+
+async def stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /stats command - show usage statistics from the rollups."""
+    if not is_admin(update):
+        return
+    # Postgres-only, like the rollups it reads
+    import stats
+
+    # Rollups only; the stats_rollup job keeps them fresh, so this never scans likes
+    summary = await stats.get_summary()
+
+    lines = [
+        "📊 *Bot Statistics*\n",
+        f"👥 Profiles: {summary['profiles']}",
+        f"👆 Swipes today: {summary['swipes_today']}",
+        f"💘 Matches today: {summary['matches_today']}",
+        f"👍 Like ratio: {summary['like_ratio']:.0%} "
+        f"({summary['likes']} likes / {summary['passes']} passes)",
+        f"🎉 Matches total: {summary['matches']}",
+    ]
+    if summary["as_of"] is None:
+        lines.append("🕒 Not counted yet; the rollup job runs every few minutes")
+    else:
+        lines.append(f"🕒 As of {summary['as_of']:%Y-%m-%d %H:%M}")
+    if summary["matches_per_university"]:
+        lines.append("\n🏫 *Matches per university:*")
+        for university, matches in summary["matches_per_university"]:
+            name = escape_markdown(university or "Not set")
+            lines.append(f"• {name}: {matches}")
+
+    scheduler = context.bot_data.get("maintenance")
+    if scheduler:
+        lines.append("\n⚙️ *Maintenance jobs:*")
+        for name, metrics in scheduler.metrics().items():
+            lines.append(
+                f"• {escape_markdown(name)}: {metrics.runs} runs, {metrics.failures} failed, "
+                f"last {metrics.last_outcome or 'never'} ({metrics.last_seconds * 1000:.0f} ms)"
+            )
+
+    await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
+
+
+async def broadcast_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /broadcast command.
+
+    /broadcast <message> sends <message> to every user, /broadcast cancel
+    stops the running broadcast and /broadcast alone shows its progress.
+    """
+    if not is_admin(update):
+        return
+    # Only loaded by the rare admin who broadcasts
+    import broadcast
+
+    parts = update.message.text.split(None, 1)
+    argument = parts[1].strip() if len(parts) > 1 else ""
+
+    if argument.lower() == "cancel":
+        broadcast_id = await broadcast.cancel_broadcast()
+        if broadcast_id is None:
+            await update.message.reply_text("No broadcast is running.")
+        else:
+            await update.message.reply_text(f"🛑 Broadcast #{broadcast_id} cancelled.")
+        return
+
+    if argument:
+        broadcast_id = await broadcast.start_broadcast(
+            context.application, argument, update.effective_user.id
+        )
+        if broadcast_id is None:
+            await update.message.reply_text(
+                "A broadcast is already running. Use /broadcast to check on it "
+                "or /broadcast cancel to stop it."
+            )
+        else:
+            await update.message.reply_text(
+                f"📣 Broadcast #{broadcast_id} started. Use /broadcast to check progress."
+            )
+        return
+
+    latest = await broadcast.get_latest_broadcast()
+    if latest is None:
+        await update.message.reply_text("No broadcasts yet. Usage: /broadcast <message>")
+        return
+
+    delivered = latest["sent"] + latest["failed"] + latest["blocked"]
+    lines = [
+        f"📣 *Broadcast #{latest['id']}*: {latest['status']}\n",
+        f"✅ Sent: {latest['sent']}",
+        f"⚠️ Failed: {latest['failed']}",
+        f"🚫 Blocked the bot: {latest['blocked']}",
+    ]
+    if latest["status"] == broadcast.RUNNING:
+        lines.append(f"⏳ Remaining: about {max(latest['recipients'] - delivered, 0)}")
+    await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
@@ -1,9 +1,10 @@
 """Profile browsing/discovery handlers."""
 
-from telegram import Update, InputMediaPhoto
+from telegram import Update
 from telegram.ext import ContextTypes
 
-import database as db
+from storage import get_storage
+from cards import render_profile_card, send_profile_card
 from constants import HOMEPAGE, BROWSING, BTN_LIKE, BTN_PASS, BTN_STOP_BROWSING
 from keyboards import get_homepage_keyboard, get_browse_keyboard
 
@@ -11,7 +12,7 @@ from keyboards import get_homepage_keyboard, get_browse_keyboard
 async def show_next_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Show the next profile to the user."""
     user = update.effective_user
-    profile = await db.get_next_profile(user.id)
+    profile = await get_storage().get_next_profile(user.id)
     
     if not profile:
         await update.message.reply_text(
@@ -25,46 +26,13 @@ async def show_next_profile(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Store current profile being viewed
     context.user_data["viewing_profile"] = profile["telegram_id"]
     
-    # Format profile text
-    profile_text = (
-        f"🏫 *University:* {profile['university'] or 'Not set'}\n"
-        f"📚 *Program:* {profile['program'] or 'Not set'}\n"
-        f"📝 *About:* {profile['bio'] or 'Not set'}"
-    )
-    
     # Send profile with photos if available
-    if profile["photos"]:
-        if len(profile["photos"]) == 1:
-            await context.bot.send_photo(
-                chat_id=update.effective_chat.id,
-                photo=profile["photos"][0],
-                caption=profile_text,
-                parse_mode="Markdown",
-                reply_markup=get_browse_keyboard(),
-            )
-        else:
-            media = [
-                InputMediaPhoto(
-                    media=profile["photos"][0],
-                    caption=profile_text,
-                    parse_mode="Markdown",
-                )
-            ]
-            media.extend([InputMediaPhoto(file_id) for file_id in profile["photos"][1:]])
-            await context.bot.send_media_group(
-                chat_id=update.effective_chat.id,
-                media=media,
-            )
-            await update.message.reply_text(
-                "👆 What do you think?",
-                reply_markup=get_browse_keyboard(),
-            )
-    else:
-        await update.message.reply_text(
-            profile_text + "\n📷 *Photos:* None",
-            reply_markup=get_browse_keyboard(),
-            parse_mode="Markdown",
-        )
+    card = render_profile_card(profile)
+    await send_profile_card(
+        update, context, card,
+        reply_markup=get_browse_keyboard(),
+        album_prompt="👆 What do you think?",
+    )
     
     return BROWSING
 
@@ -80,10 +48,10 @@ async def like_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     target_id = context.user_data.get("viewing_profile")
     
     if target_id:
-        await db.record_interaction(user.id, target_id, is_like=True)
+        await get_storage().record_interaction(user.id, target_id, is_like=True)
         
         # Check for mutual like
-        if await db.check_mutual_like(user.id, target_id):
+        if await get_storage().check_mutual_like(user.id, target_id):
             await update.message.reply_text(
                 "🎉 *It's a match!*\n\n"
                 "You both liked each other!",
@@ -99,7 +67,7 @@ async def pass_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     target_id = context.user_data.get("viewing_profile")
     
     if target_id:
-        await db.record_interaction(user.id, target_id, is_like=False)
+        await get_storage().record_interaction(user.id, target_id, is_like=False)
     
     return await show_next_profile(update, context)
 
@@ -3,7 +3,7 @@
 from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes
 
-import database as db
+from storage import get_storage
 from constants import HOMEPAGE, AWAITING_PHOTOS, AWAITING_UNIVERSITY, AWAITING_PROGRAM, AWAITING_BIO
 from keyboards import get_homepage_keyboard, get_photo_upload_keyboard
 from config import MAX_PHOTOS
@@ -89,7 +89,7 @@ async def receive_bio_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # Save profile with photos
     photos = context.user_data.get("photos", [])
-    await db.save_profile(
+    await get_storage().save_profile(
         telegram_id=user.id,
         university=context.user_data.get("university"),
         program=context.user_data.get("program"),
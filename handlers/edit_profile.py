@@ -1,9 +1,19 @@
-"""Profile editing handlers."""
+"""Profile editing handlers.
+
+Editing runs as a session: the profile is loaded once when the user opens
+the edit menu, field edits are staged in ``context.user_data``, and
+everything is written in one upsert when the user goes back home (or
+leaves with /start or /cancel; sessions still open at shutdown are saved
+too). The write is skipped if the profile changed in the meantime (its
+``updated_at`` no longer matches the snapshot).
+"""
+
+import logging
 
 from telegram import Update, ReplyKeyboardRemove
-from telegram.ext import ContextTypes
+from telegram.ext import Application, ContextTypes
 
-import database as db
+from storage import get_storage
 from constants import (
     HOMEPAGE, EDIT_MENU, EDIT_PHOTOS, EDIT_UNIVERSITY, EDIT_PROGRAM, EDIT_BIO,
     BTN_EDIT_PHOTOS, BTN_EDIT_UNIVERSITY, BTN_EDIT_PROGRAM, BTN_EDIT_BIO, BTN_BACK_HOME,
@@ -12,6 +22,87 @@ from constants import (
 from keyboards import get_homepage_keyboard, get_edit_menu_keyboard, get_photo_upload_keyboard, get_text_edit_keyboard
 from config import MAX_PHOTOS
 
+logger = logging.getLogger(__name__)
+
+# Shown after each staged edit
+_NOT_SAVED_YET = f"Not saved yet: tap '{BTN_BACK_HOME}' to save your changes."
+
+
+async def start_edit_session(user_id: int, context: ContextTypes.DEFAULT_TYPE):
+    """Load the profile once and start staging edits against it."""
+    context.user_data["edit_session"] = {
+        # From the primary: a stale updated_at would fail the conflict check
+        "snapshot": await get_storage().get_profile(user_id, primary=True),
+        "staged": {},
+    }
+
+
+async def _get_edit_session(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> dict:
+    """Get the current edit session, starting one if needed."""
+    if "edit_session" not in context.user_data:
+        await start_edit_session(user_id, context)
+    return context.user_data["edit_session"]
+
+
+def _current_value(session: dict, field: str) -> str:
+    """Value of a field as the user currently sees it (staged or saved)."""
+    if field in session["staged"]:
+        return session["staged"][field]
+    snapshot = session["snapshot"]
+    return (snapshot[field] if snapshot else None) or "Not set"
+
+
+async def _save_session(user_id: int, session: dict | None) -> bool | None:
+    if not session or not session["staged"]:
+        return None
+
+    snapshot = session["snapshot"]
+    return await get_storage().save_profile(
+        user_id,
+        expected_updated_at=snapshot["updated_at"] if snapshot else None,
+        **session["staged"],
+    )
+
+
+async def commit_edit_session(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool | None:
+    """Write all staged edits in one upsert and end the session.
+
+    Returns:
+        None if nothing was staged, True if saved, False if the profile was
+        changed elsewhere since the session started (nothing is written).
+    """
+    return await _save_session(user_id, context.user_data.pop("edit_session", None))
+
+
+async def commit_pending_edit_sessions(application: Application):
+    """Save every user's open edit session (called on shutdown)."""
+    saved, conflicts = 0, 0
+    for user_id, user_data in list(application.user_data.items()):
+        session = user_data.pop("edit_session", None)
+        try:
+            result = await _save_session(user_id, session)
+        except Exception:
+            logger.exception(f"Failed to save staged profile edits of {user_id}")
+            continue
+        if result:
+            saved += 1
+        elif result is False:
+            conflicts += 1
+    if saved or conflicts:
+        logger.info(f"Saved {saved} open edit session(s), {conflicts} skipped as conflicting")
+
+
+def session_status(saved: bool | None) -> str:
+    """Line telling the user what happened to their staged edits."""
+    if saved is False:
+        return (
+            "⚠️ Your profile was changed somewhere else in the meantime, "
+            "so these edits were not saved. Please edit it again.\n\n"
+        )
+    if saved:
+        return "✅ Profile saved!\n\n"
+    return ""
+
 
 async def edit_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle edit menu button presses."""
@@ -30,8 +121,8 @@ async def edit_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return EDIT_PHOTOS
     
     elif text == BTN_EDIT_UNIVERSITY:
-        profile = await db.get_profile(update.effective_user.id)
-        current = profile["university"] if profile else "Not set"
+        session = await _get_edit_session(update.effective_user.id, context)
+        current = _current_value(session, "university")
         await update.message.reply_text(
             f"🏫 *Edit University*\n\n"
             f"Current: {current}\n\n"
@@ -42,8 +133,8 @@ async def edit_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return EDIT_UNIVERSITY
     
     elif text == BTN_EDIT_PROGRAM:
-        profile = await db.get_profile(update.effective_user.id)
-        current = profile["program"] if profile else "Not set"
+        session = await _get_edit_session(update.effective_user.id, context)
+        current = _current_value(session, "program")
         await update.message.reply_text(
             f"📚 *Edit Program*\n\n"
             f"Current: {current}\n\n"
@@ -54,8 +145,8 @@ async def edit_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return EDIT_PROGRAM
     
     elif text == BTN_EDIT_BIO:
-        profile = await db.get_profile(update.effective_user.id)
-        current = profile["bio"] if profile else "Not set"
+        session = await _get_edit_session(update.effective_user.id, context)
+        current = _current_value(session, "bio")
         await update.message.reply_text(
             f"📝 *Edit Bio*\n\n"
             f"Current: {current}\n\n"
@@ -66,9 +157,12 @@ async def edit_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return EDIT_BIO
     
     elif text == BTN_BACK_HOME:
-        has_profile = await db.profile_exists(update.effective_user.id)
+        session = await _get_edit_session(update.effective_user.id, context)
+        has_profile = session["snapshot"] is not None or bool(session["staged"])
+        saved = await commit_edit_session(update.effective_user.id, context)
+        
         await update.message.reply_text(
-            "🏠 *Home*\n\nWhat would you like to do?",
+            f"{session_status(saved)}🏠 *Home*\n\nWhat would you like to do?",
             reply_markup=get_homepage_keyboard(has_profile),
             parse_mode="Markdown",
         )
@@ -88,7 +182,7 @@ async def edit_photos_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     if len(photos) >= MAX_PHOTOS:
         await update.message.reply_text(
-            f"❌ You've already uploaded {MAX_PHOTOS} photos. Tap 'Done' to save.",
+            f"❌ You've already uploaded {MAX_PHOTOS} photos. Tap 'Done' to continue.",
             reply_markup=get_photo_upload_keyboard(),
         )
         return EDIT_PHOTOS
@@ -101,7 +195,7 @@ async def edit_photos_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     await update.message.reply_text(
         f"📷 Photo {len(photos)}/{MAX_PHOTOS} received!\n"
-        f"{'Upload more or tap Done.' if remaining > 0 else 'Tap Done to save.'}",
+        f"{'Upload more or tap Done.' if remaining > 0 else 'Tap Done to continue.'}",
         reply_markup=get_photo_upload_keyboard(),
     )
     return EDIT_PHOTOS
@@ -109,16 +203,17 @@ async def edit_photos_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def edit_photos_done_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle 'Done' button for photo editing."""
-    user = update.effective_user
-    photos = context.user_data.get("photos", [])
+    photos = context.user_data.pop("photos", [])
     
     if photos:
-        await db.save_photos(user.id, photos)
-    
-    context.user_data.clear()
+        session = await _get_edit_session(update.effective_user.id, context)
+        session["staged"]["photos"] = photos
+        status = f"✅ New photos ready ({len(photos)} photo(s)).\n{_NOT_SAVED_YET}"
+    else:
+        status = "No photos uploaded; your photos were not changed."
     
     await update.message.reply_text(
-        f"✅ Photos updated! ({len(photos)} photo(s))\n\n"
+        f"{status}\n\n"
         "What else would you like to edit?",
         reply_markup=get_edit_menu_keyboard(),
         parse_mode="Markdown",
@@ -128,10 +223,12 @@ async def edit_photos_done_handler(update: Update, context: ContextTypes.DEFAULT
 
 async def edit_university_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle university editing."""
-    await db.save_profile(update.effective_user.id, university=update.message.text)
+    session = await _get_edit_session(update.effective_user.id, context)
+    session["staged"]["university"] = update.message.text
     
     await update.message.reply_text(
-        f"✅ University updated to: {update.message.text}\n\n"
+        f"✅ University changed to: {update.message.text}\n"
+        f"{_NOT_SAVED_YET}\n\n"
         "What else would you like to edit?",
         reply_markup=get_edit_menu_keyboard(),
     )
@@ -140,10 +237,12 @@ async def edit_university_handler(update: Update, context: ContextTypes.DEFAULT_
 
 async def edit_program_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle program editing."""
-    await db.save_profile(update.effective_user.id, program=update.message.text)
+    session = await _get_edit_session(update.effective_user.id, context)
+    session["staged"]["program"] = update.message.text
     
     await update.message.reply_text(
-        f"✅ Program updated to: {update.message.text}\n\n"
+        f"✅ Program changed to: {update.message.text}\n"
+        f"{_NOT_SAVED_YET}\n\n"
         "What else would you like to edit?",
         reply_markup=get_edit_menu_keyboard(),
     )
@@ -152,10 +251,12 @@ async def edit_program_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def edit_bio_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle bio editing."""
-    await db.save_profile(update.effective_user.id, bio=update.message.text)
+    session = await _get_edit_session(update.effective_user.id, context)
+    session["staged"]["bio"] = update.message.text
     
     await update.message.reply_text(
-        "✅ Bio updated!\n\n"
+        "✅ Bio changed.\n"
+        f"{_NOT_SAVED_YET}\n\n"
         "What else would you like to edit?",
         reply_markup=get_edit_menu_keyboard(),
     )
@@ -163,11 +264,11 @@ async def edit_bio_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 
 async def cancel_editing_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle cancel button during editing - return to edit menu without saving."""
-    context.user_data.clear()
+    """Handle cancel button during editing - return to edit menu without staging this field."""
+    context.user_data.pop("photos", None)
     
     await update.message.reply_text(
-        "❌ Cancelled. No changes saved.\n\n"
+        "❌ Cancelled. This field was not changed.\n\n"
         "What would you like to edit?",
         reply_markup=get_edit_menu_keyboard(),
     )
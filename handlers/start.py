@@ -1,9 +1,10 @@
 """Start and homepage handlers."""
 
-from telegram import Update, InputMediaPhoto
+from telegram import Update
 from telegram.ext import ContextTypes
 
-import database as db
+from storage import get_storage
+from cards import render_profile_card, send_profile_card
 from constants import (
     HOMEPAGE, AWAITING_PHOTOS, EDIT_MENU, BROWSING,
     BTN_FILL_PROFILE, BTN_EDIT_PROFILE, BTN_VIEW_PROFILE, BTN_SEARCH,
@@ -11,14 +12,18 @@ from constants import (
 from keyboards import get_homepage_keyboard, get_edit_menu_keyboard, get_photo_upload_keyboard
 from config import MAX_PHOTOS
 from handlers.browse import show_next_profile
+from handlers.edit_profile import start_edit_session, commit_edit_session, session_status
 
 
 async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle /start command - show homepage."""
     user = update.effective_user
-    has_profile = await db.profile_exists(user.id)
+    # Don't lose edits staged before jumping here from the edit menu
+    saved = await commit_edit_session(user.id, context)
+    has_profile = await get_storage().profile_exists(user.id)
     
     welcome_text = (
+        f"{session_status(saved)}"
         f"👋 Welcome, {user.first_name}!\n\n"
         "🎓 *Student Meetup Bot*\n\n"
         "Connect with fellow students from your university!\n\n"
@@ -56,9 +61,11 @@ async def homepage_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         return AWAITING_PHOTOS
     
     elif text == BTN_EDIT_PROFILE:
+        await start_edit_session(user.id, context)
         await update.message.reply_text(
             "✏️ *Edit Profile*\n\n"
-            "What would you like to change?",
+            "What would you like to change?\n"
+            "Your changes are saved when you go back home.",
             reply_markup=get_edit_menu_keyboard(),
             parse_mode="Markdown",
         )
@@ -68,7 +75,7 @@ async def homepage_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         return await show_next_profile(update, context)
     
     elif text == BTN_VIEW_PROFILE:
-        profile = await db.get_profile(user.id)
+        profile = await get_storage().get_profile(user.id)
         
         if not profile:
             await update.message.reply_text(
@@ -77,49 +84,16 @@ async def homepage_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             )
             return HOMEPAGE
         
-        profile_text = (
-            f"👤 *Your Profile*\n\n"
-            f"🏫 *University:* {profile['university'] or 'Not set'}\n"
-            f"📚 *Program:* {profile['program'] or 'Not set'}\n"
-            f"📝 *About:* {profile['bio'] or 'Not set'}"
+        card = render_profile_card(profile, own=True)
+        await send_profile_card(
+            update, context, card,
+            reply_markup=get_homepage_keyboard(True),
+            album_prompt="What would you like to do?",
         )
-        
-        if profile["photos"]:
-            if len(profile["photos"]) == 1:
-                await context.bot.send_photo(
-                    chat_id=update.effective_chat.id,
-                    photo=profile["photos"][0],
-                    caption=profile_text,
-                    parse_mode="Markdown",
-                    reply_markup=get_homepage_keyboard(True),
-                )
-            else:
-                media = [
-                    InputMediaPhoto(
-                        media=profile["photos"][0],
-                        caption=profile_text,
-                        parse_mode="Markdown",
-                    )
-                ]
-                media.extend([InputMediaPhoto(file_id) for file_id in profile["photos"][1:]])
-                await context.bot.send_media_group(
-                    chat_id=update.effective_chat.id,
-                    media=media,
-                )
-                await update.message.reply_text(
-                    "What would you like to do?",
-                    reply_markup=get_homepage_keyboard(True),
-                )
-        else:
-            await update.message.reply_text(
-                profile_text + "\n📷 *Photos:* None uploaded",
-                reply_markup=get_homepage_keyboard(True),
-                parse_mode="Markdown",
-            )
         return HOMEPAGE
     
     # Unknown input
-    has_profile = await db.profile_exists(user.id)
+    has_profile = await get_storage().profile_exists(user.id)
     await update.message.reply_text(
         "Please use the buttons below.",
         reply_markup=get_homepage_keyboard(has_profile),
@@ -147,11 +121,13 @@ async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 async def cancel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancel and return to homepage."""
+    # Edits already confirmed field by field are kept, as with "Back to Home"
+    saved = await commit_edit_session(update.effective_user.id, context)
     context.user_data.clear()
-    has_profile = await db.profile_exists(update.effective_user.id)
+    has_profile = await get_storage().profile_exists(update.effective_user.id)
     
     await update.message.reply_text(
-        "❌ Cancelled. Returning to home.",
+        f"{session_status(saved)}❌ Cancelled. Returning to home.",
         reply_markup=get_homepage_keyboard(has_profile),
     )
     return HOMEPAGE
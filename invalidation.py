@@ -0,0 +1,153 @@
+"""Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+save_profile publishes a small, fixed-size change event (the profile ID,
+its new ``updated_at`` and whether the profile is new) on
+PROFILE_CHANGES_CHANNEL inside its transaction, so the event is delivered
+only if the write commits. Profile contents are never sent: a payload over
+NOTIFY's 8000-byte limit would fail the write. Every worker listens on a
+dedicated asyncpg connection, drops whatever the change makes stale (that
+profile's rendered cards and "nothing left to see" markers) and adds new
+profiles to its candidate index.
+
+Notifications sent while a worker is disconnected are lost, so after a
+reconnect the worker flushes those caches and reloads the candidate index.
+For the same reason the first index load waits until the listener is
+subscribed (see load_candidate_index).
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import suppress
+
+import asyncpg
+
+import candidates
+import cards
+import database as db
+from config import CANDIDATE_INDEX
+
+logger = logging.getLogger(__name__)
+
+# Reconnect backoff bounds (seconds)
+_RECONNECT_MIN = 1.0
+_RECONNECT_MAX = 60.0
+# A half-open TCP connection isn't always noticed; ping this often
+_HEALTH_CHECK = 30.0
+
+_task: asyncio.Task | None = None
+# Set once the first LISTEN succeeded
+_listening: asyncio.Event | None = None
+
+
+def _dsn() -> str:
+    """The primary's URL in the plain form asyncpg.connect expects."""
+    url = db.get_engine().url.set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+def _on_notification(connection, pid: int, channel: str, payload: str):
+    try:
+        change = json.loads(payload)
+        telegram_id = int(change["id"])
+    except (ValueError, KeyError, TypeError):
+        logger.warning(f"Ignoring malformed profile change: {payload!r}")
+        return
+
+    cards.evict(telegram_id)
+    if change.get("reindex"):
+        # New profile
+        candidates.index.add(telegram_id)
+    db.reset_pool_exhausted()
+
+
+async def _flush_all():
+    """Drop everything that might have missed a change."""
+    cards.clear()
+    db.reset_pool_exhausted()
+    if CANDIDATE_INDEX:
+        await db.load_candidate_index()
+    logger.info("Caches flushed after reconnecting to profile changes")
+
+
+async def _listen_forever():
+    delay = _RECONNECT_MIN
+    connected_before = False
+    while True:
+        try:
+            connection = await asyncpg.connect(_dsn())
+        except (OSError, asyncpg.PostgresError) as e:
+            logger.warning(f"Can't listen for profile changes ({e}); retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RECONNECT_MAX)
+            continue
+
+        try:
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(db.PROFILE_CHANGES_CHANNEL, _on_notification)
+            _listening.set()
+            if connected_before:
+                # Subscribed again first, so nothing falls between flush and listen
+                await _flush_all()
+            connected_before = True
+            delay = _RECONNECT_MIN
+            logger.info("Listening for profile changes")
+
+            while not lost.is_set():
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(lost.wait(), _HEALTH_CHECK)
+                if not lost.is_set():
+                    await connection.execute("SELECT 1", timeout=_HEALTH_CHECK)
+            logger.warning("Profile change listener disconnected; reconnecting")
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.warning(f"Profile change listener failed ({e}); reconnecting")
+        except Exception:
+            # e.g. the index reload in _flush_all; keep listening regardless
+            logger.exception("Profile change listener failed; reconnecting")
+        finally:
+            connection.terminate()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _RECONNECT_MAX)
+
+
+def start():
+    """Start listening for profile changes in the background."""
+    global _task, _listening
+    if _task is None:
+        _listening = asyncio.Event()
+        _task = asyncio.create_task(_listen_forever(), name="invalidation")
+
+
+async def wait_listening(timeout: float) -> bool:
+    """Wait until subscribed to profile changes; False if not within ``timeout``."""
+    if _listening is None:
+        return False
+    try:
+        await asyncio.wait_for(_listening.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def load_candidate_index():
+    """(Re)build the candidate index once subscribed to profile changes.
+
+    A change committed after the index query started but before the
+    subscription would otherwise be missed until the next rebuild. If the listener
+    can't connect in time the index is loaded anyway; the reload after
+    it reconnects covers the gap.
+    """
+    if not await wait_listening(_HEALTH_CHECK):
+        logger.warning("Loading the candidate index before listening for profile changes")
+    await db.load_candidate_index()
+
+
+async def stop():
+    """Stop listening and close the connection."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        with suppress(asyncio.CancelledError):
+            await _task
+        _task = None
@@ -1,4 +1,8 @@
-"""Keyboard definitions for the Student Meetup Bot."""
+"""Keyboard definitions for the Student Meetup Bot.
+
+Keyboards are built once at import time. ReplyKeyboardMarkup objects are
+immutable, so the same instance is safely reused for every message.
+"""
 
 from telegram import ReplyKeyboardMarkup
 from constants import (
@@ -8,52 +12,74 @@ from constants import (
     BTN_LIKE, BTN_PASS, BTN_STOP_BROWSING,
 )
 
+HOMEPAGE_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [BTN_SEARCH],
+        [BTN_EDIT_PROFILE, BTN_VIEW_PROFILE],
+    ],
+    resize_keyboard=True,
+)
+
+NEW_USER_HOMEPAGE_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [BTN_FILL_PROFILE],
+    ],
+    resize_keyboard=True,
+)
+
+EDIT_MENU_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [BTN_EDIT_PHOTOS, BTN_EDIT_UNIVERSITY],
+        [BTN_EDIT_PROGRAM, BTN_EDIT_BIO],
+        [BTN_BACK_HOME],
+    ],
+    resize_keyboard=True,
+)
+
+PHOTO_UPLOAD_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [BTN_DONE_PHOTOS],
+        [BTN_CANCEL_EDITING],
+    ],
+    resize_keyboard=True,
+)
+
+TEXT_EDIT_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [BTN_CANCEL_EDITING],
+    ],
+    resize_keyboard=True,
+)
+
+BROWSE_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [BTN_LIKE, BTN_PASS],
+        [BTN_STOP_BROWSING],
+    ],
+    resize_keyboard=True,
+)
+
 
 def get_homepage_keyboard(has_profile: bool = False) -> ReplyKeyboardMarkup:
     """Get the homepage keyboard based on whether user has a profile."""
-    if has_profile:
-        keyboard = [
-            [BTN_SEARCH],
-            [BTN_EDIT_PROFILE, BTN_VIEW_PROFILE],
-        ]
-    else:
-        keyboard = [
-            [BTN_FILL_PROFILE],
-        ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return HOMEPAGE_KEYBOARD if has_profile else NEW_USER_HOMEPAGE_KEYBOARD
 
 
 def get_edit_menu_keyboard() -> ReplyKeyboardMarkup:
     """Get the edit menu keyboard."""
-    keyboard = [
-        [BTN_EDIT_PHOTOS, BTN_EDIT_UNIVERSITY],
-        [BTN_EDIT_PROGRAM, BTN_EDIT_BIO],
-        [BTN_BACK_HOME],
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return EDIT_MENU_KEYBOARD
 
 
 def get_photo_upload_keyboard() -> ReplyKeyboardMarkup:
     """Get the keyboard for photo upload state."""
-    keyboard = [
-        [BTN_DONE_PHOTOS],
-        [BTN_CANCEL_EDITING],
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return PHOTO_UPLOAD_KEYBOARD
 
 
 def get_text_edit_keyboard() -> ReplyKeyboardMarkup:
     """Get the keyboard for text editing states (university, program, bio)."""
-    keyboard = [
-        [BTN_CANCEL_EDITING],
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return TEXT_EDIT_KEYBOARD
 
 
 def get_browse_keyboard() -> ReplyKeyboardMarkup:
     """Get the keyboard for browsing profiles."""
-    keyboard = [
-        [BTN_LIKE, BTN_PASS],
-        [BTN_STOP_BROWSING],
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return BROWSE_KEYBOARD
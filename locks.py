@@ -0,0 +1,13 @@
+"""Postgres advisory lock keys shared by all workers.
+
+Keys are arbitrary but must be unique within the application; keep them
+all here so a new one can't collide with an existing one.
+"""
+
+# pg_advisory_xact_lock keys (single bigint)
+MIGRATIONS = 7_352_019_884
+STATS_ROLLUP = 7_352_019_885
+LIKES_PARTITIONS = 7_352_019_886
+
+# pg_try_advisory_lock classid (int), paired with the broadcast ID as objid
+BROADCASTS = 73_520_198
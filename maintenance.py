@@ -0,0 +1,145 @@
+"""Background maintenance scheduler for the Student Meetup Bot.
+
+Batch jobs (rollups, partition upkeep, ANALYZE, cache pruning) run on the
+Application's job queue instead of inline in handlers. Each job:
+
+- runs every ``interval`` seconds, with random ``jitter`` so workers
+  don't fire in lockstep (intervals can be overridden with
+  MAINTENANCE_INTERVALS);
+- never overlaps its own previous run;
+- waits while interactive traffic is heavy (see ``is_busy``), giving up
+  for this round after one interval;
+- records run time and outcome in ``JobMetrics``.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from telegram.ext import Application, ContextTypes
+
+from config import (
+    MAINTENANCE_INTERVALS, MAINTENANCE_MAX_LATENCY, MAINTENANCE_MAX_QUEUE,
+)
+
+logger = logging.getLogger(__name__)
+
+# How often a deferred job re-checks the load
+_BACKOFF = 5.0
+# Latency samples older than this no longer count as "under load"
+_LATENCY_WINDOW = 30.0
+
+# Outcomes
+OK = "ok"
+FAILED = "failed"
+DEFERRED = "deferred"
+SKIPPED = "skipped"  # Previous run still going
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    deferred: int = 0
+    skipped: int = 0
+    total_seconds: float = 0.0
+    last_seconds: float = 0.0
+    last_outcome: str = ""
+
+
+@dataclass
+class _Job:
+    name: str
+    func: Callable[[], Awaitable[object]]
+    interval: float
+    jitter: float
+    metrics: JobMetrics
+
+
+def is_busy(application: Application) -> bool:
+    """Whether interactive traffic is heavy enough that batch work should wait."""
+    if application.update_queue.qsize() > MAINTENANCE_MAX_QUEUE:
+        return True
+    processor = application.update_processor
+    latency = getattr(processor, "latency_ewma", 0.0)
+    last_update_at = getattr(processor, "last_update_at", 0.0)
+    return (
+        latency > MAINTENANCE_MAX_LATENCY
+        and time.monotonic() - last_update_at < _LATENCY_WINDOW
+    )
+
+
+class MaintenanceScheduler:
+    """Runs registered batch jobs on an Application's job queue."""
+
+    def __init__(self, application: Application):
+        self.application = application
+        self._jobs: dict[str, _Job] = {}
+        self._running: set[str] = set()
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[object]],
+        interval: float,
+        jitter: float = 0.0,
+        first: float | None = None,
+    ):
+        """Schedule ``func`` every ``interval`` seconds (first run after ``first``)."""
+        interval = MAINTENANCE_INTERVALS.get(name, interval)
+        job = _Job(name, func, interval, jitter, JobMetrics())
+        self._jobs[name] = job
+        self.application.job_queue.run_repeating(
+            self._run,
+            interval=interval,
+            first=first if first is not None else interval,
+            name=f"maintenance:{name}",
+            data=name,
+            # Overlap is handled (and counted) in _run rather than by APScheduler
+            job_kwargs={"jitter": jitter or None, "max_instances": 2},
+        )
+
+    def metrics(self) -> dict[str, JobMetrics]:
+        """Per-job metrics, by job name."""
+        return {name: job.metrics for name, job in self._jobs.items()}
+
+    async def _run(self, context: ContextTypes.DEFAULT_TYPE):
+        job = self._jobs[context.job.data]
+        metrics = job.metrics
+
+        if job.name in self._running:
+            metrics.skipped += 1
+            metrics.last_outcome = SKIPPED
+            return
+
+        self._running.add(job.name)
+        try:
+            # Yield to interactive traffic, but not past the next scheduled run
+            waited = 0.0
+            while is_busy(self.application):
+                if waited >= job.interval or not self.application.running:
+                    metrics.deferred += 1
+                    metrics.last_outcome = DEFERRED
+                    logger.info(f"Maintenance job {job.name} deferred: bot under load")
+                    return
+                await asyncio.sleep(_BACKOFF)
+                waited += _BACKOFF
+
+            started = time.monotonic()
+            try:
+                await job.func()
+                metrics.last_outcome = OK
+            except Exception:
+                metrics.failures += 1
+                metrics.last_outcome = FAILED
+                logger.exception(f"Maintenance job {job.name} failed")
+            finally:
+                elapsed = time.monotonic() - started
+                metrics.runs += 1
+                metrics.last_seconds = elapsed
+                metrics.total_seconds += elapsed
+                logger.debug(f"Maintenance job {job.name}: {metrics.last_outcome} in {elapsed:.2f}s")
+        finally:
+            self._running.discard(job.name)
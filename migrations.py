@@ -0,0 +1,272 @@
+"""Versioned schema migrations for the Student Meetup Bot.
+
+Each migration is an ordered step registered with ``@migration``. The
+applied version lives in a one-row ``schema_version`` table, so a worker
+whose schema is current only reads that row at startup. Pending steps run
+in a single transaction under an advisory lock, so concurrent workers
+never apply the same step twice.
+
+Steps are frozen once released: to change the schema, append a new step
+(and update the tables in database.py to match) instead of editing an old one.
+"""
+
+import logging
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+import locks
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a migration step; versions must be added in increasing order."""
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append(Migration(version, description, func))
+        return func
+    return decorator
+
+
+# --- Migration steps ---
+
+@migration(1, "create users and likes tables")
+async def _create_base_tables(conn: AsyncConnection):
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS users ("
+        "telegram_id BIGINT PRIMARY KEY, "
+        "university TEXT, "
+        "program TEXT, "
+        "bio TEXT, "
+        "photos TEXT[], "
+        "created_at TIMESTAMP WITHOUT TIME ZONE, "
+        "updated_at TIMESTAMP WITHOUT TIME ZONE)"
+    ))
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS likes ("
+        "id SERIAL PRIMARY KEY, "
+        "user_id BIGINT NOT NULL REFERENCES users (telegram_id), "
+        "target_user_id BIGINT NOT NULL REFERENCES users (telegram_id), "
+        "is_like BOOLEAN NOT NULL, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE)"
+    ))
+
+
+@migration(2, "partition likes by is_like and passes by month")
+async def _partition_likes(conn: AsyncConnection):
+    if await _is_partitioned(conn, "likes"):
+        return
+
+    await conn.execute(text("ALTER TABLE likes RENAME TO likes_legacy"))
+    await conn.execute(text("ALTER INDEX likes_pkey RENAME TO likes_legacy_pkey"))
+    await conn.execute(text(
+        "CREATE TABLE likes ("
+        "id SERIAL NOT NULL, "
+        "user_id BIGINT NOT NULL REFERENCES users (telegram_id), "
+        "target_user_id BIGINT NOT NULL REFERENCES users (telegram_id), "
+        "is_like BOOLEAN NOT NULL, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "PRIMARY KEY (id, is_like, created_at)"
+        ") PARTITION BY LIST (is_like)"
+    ))
+
+    # Partitions as of this step (frozen; later upkeep is database.py's job):
+    # likes/passes, a default and one per month from the oldest pass to two
+    # months ahead
+    await conn.execute(text(
+        "CREATE TABLE likes_like PARTITION OF likes FOR VALUES IN (true)"
+    ))
+    await conn.execute(text(
+        "CREATE TABLE likes_pass PARTITION OF likes FOR VALUES IN (false) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+    await conn.execute(text("CREATE TABLE likes_pass_default PARTITION OF likes_pass DEFAULT"))
+    result = await conn.execute(text(
+        "SELECT to_char(m, 'YYYYMM'), m::date, (m + interval '1 month')::date "
+        "FROM generate_series("
+        "date_trunc('month', COALESCE("
+        "(SELECT min(created_at) FROM likes_legacy WHERE NOT is_like), localtimestamp)), "
+        "date_trunc('month', localtimestamp) + interval '2 months', "
+        "interval '1 month') AS m"
+    ))
+    for suffix, lower, upper in result.fetchall():
+        await conn.execute(text(
+            f"CREATE TABLE likes_pass_p{suffix} PARTITION OF likes_pass "
+            f"FOR VALUES FROM ('{lower:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+        ))
+
+    await conn.execute(text(
+        "INSERT INTO likes (user_id, target_user_id, is_like, created_at) "
+        "SELECT user_id, target_user_id, is_like, COALESCE(created_at, now()) "
+        "FROM likes_legacy"
+    ))
+    await conn.execute(text("DROP TABLE likes_legacy"))
+
+
+@migration(3, "index likes by (user_id, target_user_id, created_at)")
+async def _index_likes_seen(conn: AsyncConnection):
+    await conn.execute(text("DROP INDEX IF EXISTS ix_likes_user_target"))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_likes_user_seen "
+        "ON likes (user_id, target_user_id, created_at)"
+    ))
+
+
+@migration(4, "track resumable bulk imports")
+async def _create_bulk_import_progress(conn: AsyncConnection):
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS bulk_import_progress ("
+        "source TEXT PRIMARY KEY, "
+        "rows_done BIGINT NOT NULL, "
+        "updated_at TIMESTAMP WITH TIME ZONE NOT NULL)"
+    ))
+
+
+@migration(5, "usage statistics rollups")
+async def _create_stats_rollups(conn: AsyncConnection):
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS stats_daily ("
+        "day DATE NOT NULL, "
+        "university TEXT NOT NULL, "
+        "profiles BIGINT NOT NULL DEFAULT 0, "
+        "likes BIGINT NOT NULL DEFAULT 0, "
+        "passes BIGINT NOT NULL DEFAULT 0, "
+        "matches BIGINT NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (day, university))"
+    ))
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS stats_watermark ("
+        "name TEXT PRIMARY KEY, "
+        "value TIMESTAMP WITHOUT TIME ZONE NOT NULL)"
+    ))
+    # Delta scans by creation time
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_likes_created_at ON likes (created_at)"
+    ))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_users_created_at ON users (created_at)"
+    ))
+
+
+@migration(6, "admin broadcasts and blocked users")
+async def _create_broadcasts(conn: AsyncConnection):
+    await conn.execute(text(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS blocked_at TIMESTAMP WITHOUT TIME ZONE"
+    ))
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS broadcasts ("
+        "id SERIAL PRIMARY KEY, "
+        "text TEXT NOT NULL, "
+        "created_by BIGINT, "
+        "status TEXT NOT NULL, "
+        "sent BIGINT NOT NULL DEFAULT 0, "
+        "failed BIGINT NOT NULL DEFAULT 0, "
+        "blocked BIGINT NOT NULL DEFAULT 0, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE, "
+        "finished_at TIMESTAMP WITHOUT TIME ZONE)"
+    ))
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS broadcast_deliveries ("
+        "broadcast_id INTEGER NOT NULL REFERENCES broadcasts (id), "
+        "telegram_id BIGINT NOT NULL, "
+        "status TEXT NOT NULL, "
+        "PRIMARY KEY (broadcast_id, telegram_id))"
+    ))
+
+
+@migration(7, "track when users were last active")
+async def _add_last_active(conn: AsyncConnection):
+    await conn.execute(text(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMP WITHOUT TIME ZONE"
+    ))
+    # Best guess for existing users until they show up again
+    await conn.execute(text(
+        "UPDATE users SET last_active_at = COALESCE(updated_at, created_at, now()) "
+        "WHERE last_active_at IS NULL"
+    ))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_users_last_active_at ON users (last_active_at)"
+    ))
+
+
+# --- Runner ---
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def _is_partitioned(conn: AsyncConnection, table_name: str) -> bool:
+    """Check whether an existing table is a declaratively partitioned table."""
+    result = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+        ),
+        {"name": table_name},
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """Read the applied schema version (0 if migrations never ran)."""
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version FROM schema_version"))
+        except ProgrammingError:
+            # schema_version doesn't exist yet
+            return 0
+        return result.scalar_one_or_none() or 0
+
+
+async def migrate(engine: AsyncEngine) -> list[int]:
+    """Bring the schema up to LATEST_VERSION.
+
+    Returns:
+        The versions that were applied (empty if already current).
+    """
+    # Fast path: one single-row read, no locking or introspection
+    if await get_schema_version(engine) >= LATEST_VERSION:
+        return []
+
+    applied = []
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": locks.MIGRATIONS}
+        )
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+        ))
+
+        # Another worker may have migrated while we waited for the lock
+        result = await conn.execute(text("SELECT version FROM schema_version"))
+        current = result.scalar_one_or_none()
+        if current is None:
+            await conn.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+            current = 0
+
+        for step in MIGRATIONS:
+            if step.version <= current:
+                continue
+            logger.info(f"Applying migration {step.version}: {step.description}")
+            await step.apply(conn)
+            await conn.execute(
+                text("UPDATE schema_version SET version = :version"),
+                {"version": step.version},
+            )
+            applied.append(step.version)
+
+    return applied
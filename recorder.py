@@ -0,0 +1,153 @@
+"""Opt-in recording of incoming updates, for replay.py.
+
+With RECORD_UPDATES set to a path, every update is appended to a
+gzip-compressed JSONL log together with its arrival time. Updates are
+anonymized before they are written:
+
+- every integer ``id``, ``*user_id`` and ``*chat_id`` field, wherever it
+  appears (senders, chats, forward origins, shared users, contacts...),
+  and file IDs are replaced with salted hashes, stable within one
+  recording so conversations still line up;
+- names, usernames, titles, phone numbers, addresses and place IDs are
+  dropped, or masked where the Bot API requires them;
+- locations become 0, 0 and every URL (links in entities, link previews,
+  buttons, thumbnails) becomes a placeholder;
+- free text, captions and poll texts become filler of the same length.
+  Commands and keyboard button labels are kept, since they decide which
+  handler runs.
+
+The first line is a header; each following line is ``{"t": seconds since
+the recording started, "update": {...}}``. The log is flushed periodically
+(see flush), so a killed worker leaves a readable, if truncated, recording.
+"""
+
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+
+from telegram import Update
+
+import constants
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Text that is safe to keep verbatim
+BUTTON_LABELS = frozenset(
+    value for name, value in vars(constants).items() if name.startswith("BTN_")
+)
+# Integer (or lists of integer) fields holding user or chat IDs. Every
+# integer "id" in the Bot API identifies a user or chat (message, poll and
+# callback IDs have other names or are strings), so matching by key catches
+# them wherever they are nested.
+_ID_SUFFIXES = ("user_id", "chat_id", "user_ids", "chat_ids")
+_DROPPED_KEYS = frozenset({
+    "last_name", "username", "bio", "sender_user_name", "author_signature", "vcard",
+    "foursquare_id", "google_place_id",
+})
+# Required in some objects (Contact, Venue...), so masked instead of dropped
+_MASKED_KEYS = frozenset({"phone_number", "title", "address"})
+_COORDINATE_KEYS = frozenset({"latitude", "longitude"})
+# "url" and "*_url"; required by some objects (WebAppInfo...)
+_URL_PLACEHOLDER = "https://example.com/"
+_FILE_KEYS = frozenset({"file_id", "file_unique_id"})
+_TEXT_KEYS = frozenset({"text", "caption", "question", "explanation", "description"})
+
+
+class UpdateRecorder:
+    """Writes anonymized updates to a gzip JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recorded = 0
+        self._salt = secrets.token_bytes(16)
+        self._start = time.monotonic()
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._write({"version": FORMAT_VERSION, "started_at": time.time()})
+        logger.info(f"Recording anonymized updates to {path}")
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def _digest(self, value) -> bytes:
+        return hmac.new(self._salt, str(value).encode(), hashlib.sha256).digest()
+
+    def _pseudonym_id(self, value: int) -> int:
+        # 40 bits keeps collisions unlikely and IDs in Telegram's range;
+        # negative (group) chat IDs stay negative
+        pseudonym = int.from_bytes(self._digest(abs(value))[:5], "big") + 1
+        return -pseudonym if value < 0 else pseudonym
+
+    def _pseudonym_ids(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return self._pseudonym_id(value)
+        if isinstance(value, list):
+            return [self._pseudonym_ids(item) for item in value]
+        # e.g. string callback query IDs, which identify no one
+        return value
+
+    def _anonymize(self, value):
+        if isinstance(value, dict):
+            result = {}
+            for name, item in value.items():
+                if name in _DROPPED_KEYS:
+                    continue
+                if name == "id" or name.endswith(_ID_SUFFIXES):
+                    result[name] = self._pseudonym_ids(item)
+                elif name == "first_name":
+                    result[name] = "User"
+                elif name in _FILE_KEYS:
+                    result[name] = self._digest(item).hex()[:32]
+                elif name in _TEXT_KEYS and isinstance(item, str):
+                    result[name] = _mask_text(item)
+                elif name in _MASKED_KEYS and isinstance(item, str):
+                    result[name] = "x" * len(item)
+                elif name in _COORDINATE_KEYS and isinstance(item, (int, float)):
+                    result[name] = 0.0
+                elif (name == "url" or name.endswith("_url")) and isinstance(item, str):
+                    result[name] = _URL_PLACEHOLDER
+                else:
+                    result[name] = self._anonymize(item)
+            return result
+        if isinstance(value, list):
+            return [self._anonymize(item) for item in value]
+        return value
+
+    def record(self, update: Update):
+        if self._file.closed:
+            return
+        self._write({
+            "t": round(time.monotonic() - self._start, 4),
+            "update": self._anonymize(update.to_dict()),
+        })
+        self.recorded += 1
+
+    async def flush(self):
+        """Push buffered records to disk (run periodically).
+
+        A sync flush ends on a deflate block boundary, so everything up to
+        here can be read back even if the process dies before close().
+        """
+        if not self._file.closed:
+            self._file.flush()
+
+    async def close(self):
+        """Close the log (called on shutdown)."""
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Recorded {self.recorded} update(s) to {self.path}")
+
+
+def _mask_text(text: str) -> str:
+    if text in BUTTON_LABELS:
+        return text
+    if text.startswith("/"):
+        # Keep the command, drop its arguments
+        command, _, arguments = text.partition(" ")
+        return command + (" " + "x" * len(arguments) if arguments else "")
+    return "x" * len(text)
@@ -0,0 +1,323 @@
+"""Replay recorded updates against a fresh bot, for performance comparisons.
+
+Usage:
+    python replay.py run updates.jsonl.gz [--speed 10] [--storage memory] [--output before.json]
+    python replay.py compare before.json after.json
+
+``run`` builds the Application exactly as bot.py does, but against a fake
+Bot API that answers every call locally (after ``--api-latency`` ms), and
+feeds in a log written by recorder.py at the recorded pace: ``--speed N``
+replays N times faster, ``0`` as fast as possible. It reports latency per
+update, measured from when the update was due until its handlers
+finished (so queueing counts), plus SQL statements and Bot API calls per
+update, overall and per kind of update (command, button, photo, text).
+
+Run it once per code version with ``--output`` and ``compare`` the two
+reports. Recorded users are anonymized, so they start without profiles
+unless the database was seeded for them; the memory backend gives a clean,
+repeatable run.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from telegram.request import BaseRequest
+
+from recorder import BUTTON_LABELS, FORMAT_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Updates replayed concurrently at most when running faster than recorded
+_MAX_IN_FLIGHT = 1000
+
+# Metrics shown by ``compare``
+_COMPARED = (
+    "p50_ms", "p90_ms", "p99_ms", "mean_ms", "queries_per_update", "api_calls_per_update",
+)
+
+# Counters of the update being replayed (SQL statements, Bot API calls)
+_counters: ContextVar[Counter | None] = ContextVar("replay_counters", default=None)
+
+
+class FakeBotApi(BaseRequest):
+    """Answers Bot API calls locally with minimal valid results."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        self.calls[name] += 1
+        counters = _counters.get()
+        if counters is not None:
+            counters["api_calls"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        parameters = request_data.parameters if request_data is not None else {}
+        payload = {"ok": True, "result": self._result(name.lower(), parameters)}
+        return 200, json.dumps(payload).encode()
+
+    def _message(self, parameters: dict) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": parameters.get("chat_id", 0), "type": "private"},
+        }
+
+    def _result(self, name: str, parameters: dict):
+        if name == "getme":
+            return {"id": 1, "is_bot": True, "first_name": "Replay", "username": "replay_bot"}
+        if name == "sendmediagroup":
+            media = parameters.get("media") or []
+            if isinstance(media, str):
+                media = json.loads(media)
+            return [self._message(parameters) for _ in media]
+        if name.startswith(("send", "forward", "copy", "edit")):
+            return self._message(parameters)
+        return True
+
+
+def _read_log(path: str):
+    """Yield ``(t, update dict)`` from a recording.
+
+    A recording cut short (the worker was killed) has no gzip trailer and
+    may end mid-line; everything before that point is replayed.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as log:
+        header = json.loads(next(log))
+        if header.get("version") != FORMAT_VERSION:
+            raise SystemExit(f"Unsupported recording version: {header.get('version')}")
+        try:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"{path} ends mid-record; ignoring the partial last line")
+                    return
+                yield record["t"], record["update"]
+        except EOFError:
+            logger.warning(f"{path} was not closed cleanly; replaying what was flushed")
+
+
+def _update_kind(update, button_labels: frozenset[str]) -> str:
+    """Group updates by what they trigger: a command, a button, a photo..."""
+    message = update.message
+    if message is None:
+        for name in ("callback_query", "edited_message", "my_chat_member"):
+            if getattr(update, name) is not None:
+                return name
+        return "other"
+    if message.photo:
+        return "photo"
+    if message.text:
+        if message.text.startswith("/"):
+            return message.text.split()[0]
+        if message.text in button_labels:
+            return message.text
+        return "text"
+    return "message"
+
+
+def _count_queries(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        counters = _counters.get()
+        if counters is not None:
+            counters["queries"] += 1
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _summarize(samples: list[tuple[float, int, int]]) -> dict:
+    latencies = sorted(latency * 1000 for latency, _, _ in samples)
+    count = len(samples)
+    return {
+        "updates": count,
+        "p50_ms": round(_percentile(latencies, 0.50), 3),
+        "p90_ms": round(_percentile(latencies, 0.90), 3),
+        "p99_ms": round(_percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "mean_ms": round(sum(latencies) / count, 3),
+        "queries_per_update": round(sum(queries for _, queries, _ in samples) / count, 3),
+        "api_calls_per_update": round(sum(calls for _, _, calls in samples) / count, 3),
+    }
+
+
+async def replay(path: str, speed: float, api_latency: float) -> dict:
+    """Replay a recording and return the report."""
+    # Imported here so --storage is applied before config is read
+    import bot
+    from config import STORAGE_BACKEND
+    from telegram import Update
+
+    # Handler and job logs would drown the report
+    logging.getLogger().setLevel(logging.WARNING)
+    api = FakeBotApi(api_latency)
+    application = bot.build_application("123456:replay", request=api)
+
+    errors = 0
+
+    async def on_error(update, context):
+        nonlocal errors
+        errors += 1
+        logger.debug(f"Handler error during replay: {context.error!r}")
+
+    application.add_error_handler(on_error)
+    if STORAGE_BACKEND == "postgres":
+        import database as db
+        _count_queries(db.get_engine())
+        if db.get_replica_engine() is not db.get_engine():
+            _count_queries(db.get_replica_engine())
+
+    samples: dict[str, list[tuple[float, int, int]]] = defaultdict(list)
+    in_flight = asyncio.Semaphore(_MAX_IN_FLIGHT)
+
+    async def replay_one(update: Update, due: float):
+        counters = Counter()
+        _counters.set(counters)
+        try:
+            # Through the update processor, so concurrency limits apply as in production
+            await application.update_processor.process_update(
+                update, application.process_update(update)
+            )
+        finally:
+            in_flight.release()
+        kind = _update_kind(update, BUTTON_LABELS)
+        samples[kind].append((time.monotonic() - due, counters["queries"], counters["api_calls"]))
+
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+
+    tasks = set()
+    start = time.monotonic()
+    try:
+        for t, data in _read_log(path):
+            due = start + t / speed if speed else time.monotonic()
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            update = Update.de_json(data, application.bot)
+            task = asyncio.create_task(replay_one(update, due))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+    finally:
+        await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+        await application.post_shutdown(application)
+
+    all_samples = [sample for kind_samples in samples.values() for sample in kind_samples]
+    if not all_samples:
+        raise SystemExit(f"No updates in {path}")
+    return {
+        "recording": path,
+        "storage": STORAGE_BACKEND,
+        "speed": speed,
+        "wall_seconds": round(elapsed, 3),
+        "errors": errors,
+        "total": _summarize(all_samples),
+        "by_kind": {kind: _summarize(kind_samples) for kind, kind_samples in sorted(samples.items())},
+        "api_calls": dict(api.calls),
+    }
+
+
+def _print_report(report: dict):
+    print(
+        f"{report['total']['updates']} updates in {report['wall_seconds']:.1f}s "
+        f"({report['storage']}, {report['errors']} handler errors)"
+    )
+    print(f"{'':24} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'api':>6}")
+    for kind, summary in [("total", report["total"]), *report["by_kind"].items()]:
+        print(
+            f"{kind[:24]:24} {summary['updates']:>7} {summary['p50_ms']:>9.2f} "
+            f"{summary['p99_ms']:>9.2f} {summary['queries_per_update']:>8.2f} "
+            f"{summary['api_calls_per_update']:>6.2f}"
+        )
+
+
+def compare(before: dict, after: dict):
+    """Print the metric changes between two reports."""
+    print(f"{'':40} {'before':>10} {'after':>10} {'change':>8}")
+    kinds = ["total", *sorted(set(before["by_kind"]) & set(after["by_kind"]))]
+    for kind in kinds:
+        old = before["total"] if kind == "total" else before["by_kind"][kind]
+        new = after["total"] if kind == "total" else after["by_kind"][kind]
+        print(f"{kind} ({old['updates']} / {new['updates']} updates)")
+        for metric in _COMPARED:
+            change = f"{(new[metric] - old[metric]) / old[metric]:+.0%}" if old[metric] else "n/a"
+            print(f"  {metric:38} {old[metric]:>10.2f} {new[metric]:>10.2f} {change:>8}")
+
+    only = set(before["by_kind"]) ^ set(after["by_kind"])
+    if only:
+        print(f"Only in one report: {', '.join(sorted(only))}")
+
+
+def main() -> None:
+    """Parse arguments and run a replay or a comparison."""
+    parser = argparse.ArgumentParser(description="Replay recorded updates and compare runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Replay a recording")
+    run_parser.add_argument("path", help="Recording written with RECORD_UPDATES (.jsonl.gz)")
+    run_parser.add_argument("--speed", type=float, default=1.0,
+                            help="Replay N times faster than recorded (0 = as fast as possible)")
+    run_parser.add_argument("--storage", choices=["postgres", "memory"],
+                            help="Storage backend (default: STORAGE_BACKEND)")
+    run_parser.add_argument("--api-latency", type=float, default=0.0,
+                            help="Simulated Bot API latency in milliseconds")
+    run_parser.add_argument("--output", help="Write the report to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="Compare two reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.before) as before, open(args.after) as after:
+            compare(json.load(before), json.load(after))
+        return
+
+    if args.storage:
+        os.environ["STORAGE_BACKEND"] = args.storage
+    # Don't record the replay itself
+    os.environ.pop("RECORD_UPDATES", None)
+
+    report = asyncio.run(replay(args.path, args.speed, args.api_latency / 1000))
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
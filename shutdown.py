@@ -0,0 +1,148 @@
+"""Graceful shutdown and drain for the Student Meetup Bot.
+
+On SIGTERM, ``run_polling``/``run_webhook`` stop the updater (no new updates
+are accepted) and then call ``Application.stop``. ``DrainingApplication``
+hooks into that to start a drain: updates that are in flight or already
+queued get until DRAIN_TIMEOUT to finish, after which they are cancelled
+and counted as abandoned. Buffered state is then flushed in ``post_stop``
+and the storage backend is closed in ``post_shutdown``.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from telegram.ext import Application, BaseUpdateProcessor
+
+import tracing
+from config import DRAIN_TIMEOUT
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# name -> coroutine function that writes out buffered state
+_flushers: dict[str, Callable[[], Awaitable[None]]] = {}
+
+
+def register_flush(name: str, flush: Callable[[], Awaitable[None]]):
+    """Register buffered state to be written out when the bot stops."""
+    _flushers[name] = flush
+
+
+class DrainingUpdateProcessor(BaseUpdateProcessor):
+    """Update processor that tracks in-flight updates so they can be drained.
+
+    Behaves like the default processor until ``begin_drain`` is called. Also
+    keeps a moving average of handler latency, which background work uses
+    to back off while interactive traffic is heavy.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._in_flight: set[asyncio.Task] = set()
+        self._draining = False
+        self._expired = False
+        self.handled = 0
+        self.drained = 0
+        self.abandoned = 0
+        self.latency_ewma = 0.0  # seconds
+        self.last_update_at = 0.0  # monotonic
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[None]) -> None:
+        if self._expired:
+            # Drain deadline passed; don't start anything new
+            coroutine.close()
+            self.abandoned += 1
+            return
+
+        started = time.monotonic()
+        task = asyncio.ensure_future(tracing.trace_update(update, coroutine))
+        self._in_flight.add(task)
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not self._expired:
+                raise
+            # Cancelled by the drain deadline
+            self.abandoned += 1
+            return
+        finally:
+            self._in_flight.discard(task)
+
+        self.handled += 1
+        if self._draining:
+            self.drained += 1
+
+        finished = time.monotonic()
+        self.latency_ewma += 0.1 * ((finished - started) - self.latency_ewma)
+        self.last_update_at = finished
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @property
+    def in_flight(self) -> int:
+        """Number of updates currently being processed."""
+        return len(self._in_flight)
+
+    def begin_drain(self, timeout: float):
+        """Let pending updates finish, cancelling whatever is left after ``timeout``."""
+        if self._draining:
+            return
+        self._draining = True
+        logger.info(f"Draining {self.in_flight} in-flight update(s), up to {timeout:g}s")
+        asyncio.get_running_loop().call_later(timeout, self._expire)
+
+    def _expire(self):
+        self._expired = True
+        for task in list(self._in_flight):
+            task.cancel()
+
+
+class DrainingApplication(Application):
+    """Application that starts draining its update processor when stopped."""
+
+    async def stop(self) -> None:
+        if isinstance(self.update_processor, DrainingUpdateProcessor):
+            self.update_processor.begin_drain(DRAIN_TIMEOUT)
+        await super().stop()
+
+
+async def post_stop(application: Application):
+    """Flush buffered state and report how the drain went.
+
+    All flushers share one DRAIN_TIMEOUT, so shutdown stays within the
+    platform's grace period however many are registered.
+    """
+    flushed, failed = 0, 0
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    for name, flush in _flushers.items():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.error(f"No time left to flush {name} on shutdown")
+            failed += 1
+            continue
+        try:
+            await asyncio.wait_for(flush(), timeout=remaining)
+            flushed += 1
+        except Exception:
+            logger.exception(f"Failed to flush {name} on shutdown")
+            failed += 1
+
+    processor = application.update_processor
+    if isinstance(processor, DrainingUpdateProcessor):
+        logger.info(
+            f"Shutdown drain: {processor.handled} update(s) handled, "
+            f"{processor.drained} drained, {processor.abandoned} abandoned; "
+            f"{flushed} buffer(s) flushed, {failed} failed"
+        )
+
+
+async def post_shutdown(application: Application):
+    """Close the storage backend (disposes pooled database connections)."""
+    await get_storage().close()
+    logger.info("Storage closed")
@@ -0,0 +1,52 @@
+"""Startup timing for the Student Meetup Bot.
+
+Set STARTUP_PROFILE=1 to log an import-time breakdown and the time until the
+bot handles its first update. Timing is cheap, so phases are always measured;
+the flag only controls the report.
+"""
+
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Collects named startup phases and milestones relative to process start."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._start = time.perf_counter()
+        self._phases: list[tuple[str, float, int]] = []  # (name, seconds, modules loaded)
+        self._milestones: list[tuple[str, float]] = []
+        self._reported = False
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block, e.g. a group of imports."""
+        modules_before = len(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append(
+                (name, time.perf_counter() - started, len(sys.modules) - modules_before)
+            )
+
+    def mark(self, name: str):
+        """Record a milestone (seconds since process start)."""
+        self._milestones.append((name, time.perf_counter() - self._start))
+
+    def report(self):
+        """Log the breakdown once, if enabled."""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        lines = ["Startup profile:"]
+        for name, seconds, modules in self._phases:
+            lines.append(f"  import {name:<12} {seconds * 1000:8.1f} ms  ({modules} modules)")
+        for name, seconds in self._milestones:
+            lines.append(f"  {name:<19} {seconds * 1000:8.1f} ms after start")
+        logger.info("\n".join(lines))
@@ -0,0 +1,185 @@
+"""Usage statistics rollups for the Student Meetup Bot.
+
+Counters live in ``stats_daily``, one row per (day, university), so reading
+them never touches ``users`` or ``likes``. ``refresh_stats`` folds in only
+the rows created since the last run, tracked by a ``created_at`` watermark
+in ``stats_watermark``. Rows newer than REFRESH_LAG are left for the next
+run so transactions still in flight are not skipped.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (
+    Table, Column, Date, Text, BigInteger, DateTime, select, func, text,
+)
+
+import database as db
+import locks
+
+logger = logging.getLogger(__name__)
+
+# Rows younger than this are counted on a later refresh
+REFRESH_LAG = timedelta(seconds=30)
+
+stats_daily = Table(
+    "stats_daily",
+    db.metadata,
+    Column("day", Date, primary_key=True),
+    Column("university", Text, primary_key=True),  # Normalized; '' if unset
+    Column("profiles", BigInteger, nullable=False, default=0),
+    Column("likes", BigInteger, nullable=False, default=0),
+    Column("passes", BigInteger, nullable=False, default=0),
+    Column("matches", BigInteger, nullable=False, default=0),
+)
+
+stats_watermark = Table(
+    "stats_watermark",
+    db.metadata,
+    Column("name", Text, primary_key=True),
+    Column("value", DateTime, nullable=False),
+)
+
+# Profiles created since the watermark, by creation day and university
+_PROFILES_DELTA = text("""
+    INSERT INTO stats_daily AS s (day, university, profiles, likes, passes, matches)
+    SELECT created_at::date, COALESCE(lower(trim(university)), ''), count(*), 0, 0, 0
+    FROM users
+    WHERE created_at > :lower AND created_at <= :upper
+    GROUP BY 1, 2
+    ON CONFLICT (day, university) DO UPDATE
+    SET profiles = s.profiles + EXCLUDED.profiles
+""")
+
+# Swipes since the watermark, by day and the swiper's university. A like
+# counts as a match when the reverse like was recorded before it, so each
+# match is counted exactly once.
+_INTERACTIONS_DELTA = text("""
+    INSERT INTO stats_daily AS s (day, university, profiles, likes, passes, matches)
+    SELECT
+        l.created_at::date,
+        COALESCE(lower(trim(u.university)), ''),
+        0,
+        count(*) FILTER (WHERE l.is_like),
+        count(*) FILTER (WHERE NOT l.is_like),
+        count(*) FILTER (WHERE l.is_like AND EXISTS (
+            SELECT 1 FROM likes r
+            WHERE r.user_id = l.target_user_id
+              AND r.target_user_id = l.user_id
+              AND r.is_like
+              AND r.id < l.id
+        ))
+    FROM likes l
+    JOIN users u ON u.telegram_id = l.user_id
+    WHERE l.created_at > :lower AND l.created_at <= :upper
+    GROUP BY 1, 2
+    ON CONFLICT (day, university) DO UPDATE
+    SET likes = s.likes + EXCLUDED.likes,
+        passes = s.passes + EXCLUDED.passes,
+        matches = s.matches + EXCLUDED.matches
+""")
+
+
+async def _fold(conn, lower: datetime, upper: datetime):
+    """Add rows created in (lower, upper] to the rollups and move the watermark."""
+    params = {"lower": lower, "upper": upper}
+    await conn.execute(_PROFILES_DELTA, params)
+    await conn.execute(_INTERACTIONS_DELTA, params)
+    await conn.execute(
+        text(
+            "INSERT INTO stats_watermark (name, value) VALUES ('rollup', :upper) "
+            "ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value"
+        ),
+        {"upper": upper},
+    )
+
+
+async def refresh_stats() -> datetime:
+    """Fold rows created since the last refresh into the rollups.
+
+    Returns:
+        The new watermark; everything up to it is counted.
+    """
+    upper = datetime.now() - REFRESH_LAG
+    engine = db.get_engine()
+    async with engine.begin() as conn:
+        # One refresher at a time, or deltas would be counted twice
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": locks.STATS_ROLLUP}
+        )
+        result = await conn.execute(
+            select(stats_watermark.c.value).where(stats_watermark.c.name == "rollup")
+        )
+        lower = result.scalar_one_or_none() or datetime.min
+        if upper <= lower:
+            return lower
+        await _fold(conn, lower, upper)
+    return upper
+
+
+async def rebuild_stats() -> datetime:
+    """Recount the rollups from scratch.
+
+    Needed after rows are loaded with a ``created_at`` below the watermark
+    (e.g. by bulk.py), which refresh_stats would never pick up. Scans all
+    of ``users`` and ``likes``, so it's meant for offline tools, not the bot.
+
+    Returns:
+        The new watermark.
+    """
+    upper = datetime.now() - REFRESH_LAG
+    engine = db.get_engine()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": locks.STATS_ROLLUP}
+        )
+        await conn.execute(stats_daily.delete())
+        await _fold(conn, datetime.min, upper)
+    return upper
+
+
+async def get_summary(top_universities: int = 10) -> dict:
+    """Read the headline numbers from the rollups.
+
+    ``as_of`` is the rollup watermark (None before the first refresh).
+    """
+    engine = db.get_engine()
+    async with engine.connect() as conn:
+        totals = (await conn.execute(select(
+            func.coalesce(func.sum(stats_daily.c.profiles), 0),
+            func.coalesce(func.sum(stats_daily.c.likes), 0),
+            func.coalesce(func.sum(stats_daily.c.passes), 0),
+            func.coalesce(func.sum(stats_daily.c.matches), 0),
+        ))).one()
+
+        today = (await conn.execute(select(
+            func.coalesce(func.sum(stats_daily.c.likes + stats_daily.c.passes), 0),
+            func.coalesce(func.sum(stats_daily.c.matches), 0),
+        ).where(stats_daily.c.day == date.today()))).one()
+
+        matches = func.sum(stats_daily.c.matches)
+        per_university = (await conn.execute(
+            select(stats_daily.c.university, matches.label("matches"))
+            .group_by(stats_daily.c.university)
+            .having(matches > 0)
+            .order_by(matches.desc())
+            .limit(top_universities)
+        )).fetchall()
+
+        as_of = (await conn.execute(
+            select(stats_watermark.c.value).where(stats_watermark.c.name == "rollup")
+        )).scalar_one_or_none()
+
+    profiles, total_likes, total_passes, total_matches = totals
+    swipes = total_likes + total_passes
+    return {
+        "profiles": profiles,
+        "likes": total_likes,
+        "passes": total_passes,
+        "matches": total_matches,
+        "like_ratio": total_likes / swipes if swipes else 0.0,
+        "swipes_today": today[0],
+        "matches_today": today[1],
+        "matches_per_university": [(row.university, row.matches) for row in per_university],
+        "as_of": as_of,
+    }
@@ -0,0 +1,39 @@
+"""Pluggable storage backends for the Student Meetup Bot.
+
+The backend is chosen with STORAGE_BACKEND: ``postgres`` (default) or
+``memory``. Handlers only talk to the ``Storage`` returned by get_storage().
+"""
+
+from config import STORAGE_BACKEND
+from storage.base import Storage
+
+_storage: Storage | None = None
+
+
+def create_storage(backend: str) -> Storage:
+    """Create a backend by name."""
+    if backend == "postgres":
+        # Imported lazily so the memory backend doesn't load SQLAlchemy
+        from storage.postgres import PostgresStorage
+        return PostgresStorage()
+    if backend == "memory":
+        from storage.memory import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend: {backend!r}")
+
+
+def get_storage() -> Storage:
+    """Get the configured storage backend."""
+    global _storage
+    if _storage is None:
+        _storage = create_storage(STORAGE_BACKEND)
+    return _storage
+
+
+def set_storage(storage: Storage):
+    """Replace the storage backend (e.g. with a fresh one for a benchmark run)."""
+    global _storage
+    _storage = storage
+
+
+__all__ = ["Storage", "create_storage", "get_storage", "set_storage"]
@@ -0,0 +1,71 @@
+"""Storage interface for the Student Meetup Bot."""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+
+class Storage(ABC):
+    """Everything the handlers need from a storage backend.
+
+    Profiles are plain dicts with ``telegram_id``, ``university``,
+    ``program``, ``bio``, ``photos``, ``created_at`` and ``updated_at``.
+    """
+
+    async def init(self) -> bool:
+        """Prepare the backend; returns True if the schema was changed."""
+        return False
+
+    async def close(self):
+        """Release connections and other resources."""
+
+    @abstractmethod
+    async def get_profile(self, telegram_id: int, primary: bool = False) -> dict | None:
+        """Get a user's profile by their Telegram ID.
+
+        ``primary`` skips any lagging read replica, for snapshots that later
+        writes are checked against.
+        """
+
+    @abstractmethod
+    async def save_profile(
+        self,
+        telegram_id: int,
+        university: str | None = None,
+        program: str | None = None,
+        bio: str | None = None,
+        photos: list[str] | None = None,
+        expected_updated_at: datetime | None = None,
+    ) -> bool:
+        """Create or update a profile; only the given fields are changed.
+
+        Returns False (and writes nothing) if ``expected_updated_at`` is
+        given and the existing profile's ``updated_at`` doesn't match.
+        """
+
+    async def save_photos(self, telegram_id: int, photo_file_ids: list[str]):
+        """Save photos for a user (convenience function)."""
+        await self.save_profile(telegram_id, photos=photo_file_ids)
+
+    @abstractmethod
+    async def profile_exists(self, telegram_id: int) -> bool:
+        """Check if a user has a profile."""
+
+    @abstractmethod
+    async def get_next_profile(self, telegram_id: int) -> dict | None:
+        """Pick a random recently active profile the user hasn't interacted with.
+
+        Falls back to recycled passes (``recycled`` set to True) once
+        nothing unseen is left; returns None if there is nothing to show.
+        """
+
+    @abstractmethod
+    async def record_interaction(self, user_id: int, target_user_id: int, is_like: bool):
+        """Record a like or pass interaction."""
+
+    @abstractmethod
+    async def check_mutual_like(self, user_id: int, target_user_id: int) -> bool:
+        """Check if there's a mutual like between two users."""
+
+    @abstractmethod
+    async def record_activity(self, activity_times: dict[int, datetime]):
+        """Store last-active times (telegram_id -> time) in one batch."""
@@ -0,0 +1,156 @@
+"""In-memory storage backend.
+
+Keeps everything in indexed dicts and sets, with the same semantics as
+the Postgres backend (including recycled passes). Nothing is persisted,
+so it is meant for local runs, handler benchmarks and replays where the
+database cost should be taken out of the picture.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import activity
+from config import RECYCLE_AFTER_DAYS
+from storage.base import Storage
+
+# Random probes before falling back to a full scan for an unseen profile
+_SAMPLE_TRIES = 16
+
+
+class MemoryStorage(Storage):
+    """Storage held entirely in process memory."""
+
+    def __init__(self):
+        self._users: dict[int, dict] = {}
+        self._user_ids: list[int] = []  # For O(1) random picks
+        # user_id -> target_user_id -> time of the latest interaction
+        self._seen: dict[int, dict[int, datetime]] = {}
+        # user_id -> targets ever liked
+        self._liked: dict[int, set[int]] = {}
+        # telegram_id -> last activity
+        self._last_active: dict[int, datetime] = {}
+
+    async def get_profile(self, telegram_id: int, primary: bool = False) -> dict | None:
+        user = self._users.get(telegram_id)
+        if user is None:
+            return None
+        return {**user, "photos": list(user["photos"])}
+
+    async def save_profile(
+        self,
+        telegram_id: int,
+        university: str | None = None,
+        program: str | None = None,
+        bio: str | None = None,
+        photos: list[str] | None = None,
+        expected_updated_at: datetime | None = None,
+    ) -> bool:
+        values = {
+            name: value
+            for name, value in (
+                ("university", university), ("program", program),
+                ("bio", bio), ("photos", photos),
+            )
+            if value is not None
+        }
+
+        user = self._users.get(telegram_id)
+        if user is None:
+            now = datetime.now()
+            self._users[telegram_id] = {
+                "telegram_id": telegram_id,
+                "university": university,
+                "program": program,
+                "bio": bio,
+                "photos": list(photos or []),
+                "created_at": now,
+                "updated_at": now,
+            }
+            self._user_ids.append(telegram_id)
+            self._last_active[telegram_id] = now
+            return True
+
+        if not values:
+            return True
+        if expected_updated_at is not None and user["updated_at"] != expected_updated_at:
+            return False
+        if "photos" in values:
+            values["photos"] = list(values["photos"])
+        user.update(values, updated_at=datetime.now())
+        return True
+
+    async def profile_exists(self, telegram_id: int) -> bool:
+        return telegram_id in self._users
+
+    def _is_active(self, telegram_id: int, since: datetime | None) -> bool:
+        return since is None or self._last_active[telegram_id] >= since
+
+    async def get_next_profile(self, telegram_id: int) -> dict | None:
+        seen = self._seen.get(telegram_id, {})
+        since = activity.active_since()
+
+        target_id = None
+        if self._user_ids:
+            for _ in range(_SAMPLE_TRIES):
+                candidate = random.choice(self._user_ids)
+                if (
+                    candidate != telegram_id and candidate not in seen
+                    and self._is_active(candidate, since)
+                ):
+                    target_id = candidate
+                    break
+            else:
+                unseen = [
+                    user_id for user_id in self._user_ids
+                    if user_id != telegram_id and user_id not in seen
+                    and self._is_active(user_id, since)
+                ]
+                target_id = random.choice(unseen) if unseen else None
+
+        recycled = False
+        if target_id is None:
+            target_id = self._get_recycled_id(telegram_id, since)
+            recycled = True
+        if target_id is None:
+            return None
+
+        user = self._users[target_id]
+        return {
+            "telegram_id": target_id,
+            "university": user["university"],
+            "program": user["program"],
+            "bio": user["bio"],
+            "photos": list(user["photos"]),
+            "updated_at": user["updated_at"],
+            "recycled": recycled,
+        }
+
+    def _get_recycled_id(self, telegram_id: int, since: datetime | None) -> int | None:
+        """Same policy as database._get_recycled_profile."""
+        cutoff = datetime.now() - timedelta(days=RECYCLE_AFTER_DAYS)
+        liked = self._liked.get(telegram_id, set())
+
+        best, best_key = None, None
+        for target_id, last_seen in self._seen.get(telegram_id, {}).items():
+            if target_id in liked or not self._is_active(target_id, since):
+                continue
+            updated_since = self._users[target_id]["updated_at"] > last_seen
+            if not updated_since and last_seen >= cutoff:
+                continue
+            key = (not updated_since, last_seen)
+            if best_key is None or key < best_key:
+                best, best_key = target_id, key
+        return best
+
+    async def record_interaction(self, user_id: int, target_user_id: int, is_like: bool):
+        self._seen.setdefault(user_id, {})[target_user_id] = datetime.now()
+        if is_like:
+            self._liked.setdefault(user_id, set()).add(target_user_id)
+
+    async def check_mutual_like(self, user_id: int, target_user_id: int) -> bool:
+        return user_id in self._liked.get(target_user_id, ())
+
+    async def record_activity(self, activity_times: dict[int, datetime]):
+        for telegram_id, active_at in activity_times.items():
+            if telegram_id in self._users:
+                self._last_active[telegram_id] = max(self._last_active[telegram_id], active_at)
@@ -0,0 +1,57 @@
+"""Postgres storage backend (see database.py)."""
+
+import asyncio
+from datetime import datetime
+
+import database as db
+import invalidation
+from config import CACHE_INVALIDATION
+from storage.base import Storage
+
+
+class PostgresStorage(Storage):
+    """Storage backed by the SQLAlchemy/asyncpg functions in database.py."""
+
+    async def init(self) -> bool:
+        # Migration check and connection pool warm-up run concurrently
+        migrated, _ = await asyncio.gather(db.init_db(), db.warm_pool())
+        if CACHE_INVALIDATION:
+            invalidation.start()
+        # The candidate index is loaded by the candidate_index maintenance job;
+        # discovery uses SQL until it's ready
+        return migrated
+
+    async def close(self):
+        await invalidation.stop()
+        await db.dispose_engines()
+
+    async def get_profile(self, telegram_id: int, primary: bool = False) -> dict | None:
+        return await db.get_profile(telegram_id, primary)
+
+    async def save_profile(
+        self,
+        telegram_id: int,
+        university: str | None = None,
+        program: str | None = None,
+        bio: str | None = None,
+        photos: list[str] | None = None,
+        expected_updated_at: datetime | None = None,
+    ) -> bool:
+        return await db.save_profile(
+            telegram_id, university, program, bio, photos, expected_updated_at
+        )
+
+    async def profile_exists(self, telegram_id: int) -> bool:
+        return await db.profile_exists(telegram_id)
+
+    async def get_next_profile(self, telegram_id: int) -> dict | None:
+        return await db.get_next_profile(telegram_id)
+
+    async def record_interaction(self, user_id: int, target_user_id: int, is_like: bool):
+        await db.record_interaction(user_id, target_user_id, is_like)
+
+    async def check_mutual_like(self, user_id: int, target_user_id: int) -> bool:
+        return await db.check_mutual_like(user_id, target_user_id)
+
+    async def record_activity(self, activity_times: dict[int, datetime]):
+        await db.record_activity(activity_times)
@@ -0,0 +1,6 @@
+"""Shared test setup: run against the in-memory backend, no database needed."""
+
+import os
+
+# Must be set before config is imported
+os.environ.setdefault("STORAGE_BACKEND", "memory")
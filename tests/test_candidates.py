@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from candidates import CandidateIndex, SeenCache
+
+_NONE = np.empty(0, dtype=np.int64)
+
+
+def test_sample_skips_excluded_ids():
+    index = CandidateIndex()
+    index.load([(1, None), (2, None), (3, None)])
+    exclude = np.array([1, 3], dtype=np.int64)
+    assert {index.sample(exclude) for _ in range(50)} == {2}
+
+
+def test_sample_returns_none_when_everyone_is_excluded():
+    index = CandidateIndex()
+    index.load([(1, None), (2, None)])
+    assert index.sample(np.array([1, 2], dtype=np.int64)) is None
+    assert CandidateIndex().sample(_NONE) is None
+
+
+def test_sample_filters_inactive_profiles():
+    now = datetime.now()
+    index = CandidateIndex()
+    index.load([(1, now - timedelta(days=60)), (2, now)])
+    since = now - timedelta(days=30)
+    assert {index.sample(_NONE, active_since=since) for _ in range(50)} == {2}
+
+
+def test_add_grows_past_initial_capacity():
+    index = CandidateIndex()
+    index.load([])
+    for telegram_id in range(3000):
+        index.add(telegram_id)
+    index.add(5)  # Already indexed
+    assert len(index) == 3000
+
+
+def test_load_keeps_profiles_added_during_rebuild():
+    index = CandidateIndex()
+    index.load([(1, None)])
+    index.begin_load()
+    index.add(2)  # Written after the rebuild's query ran
+    index.load([(1, None)])
+    index.end_load()
+    assert len(index) == 2
+
+    # Once the rebuild is over, later loads replace the index outright
+    index.load([(1, None)])
+    assert len(index) == 1
+
+
+def test_touch_only_moves_activity_forward():
+    now = datetime.now()
+    index = CandidateIndex()
+    index.load([(1, now)])
+    index.touch({1: now - timedelta(days=60), 99: now})
+    assert index.sample(_NONE, active_since=now - timedelta(seconds=1)) == 1
+
+
+def test_seen_cache_evicts_least_recently_used():
+    cache = SeenCache(max_size=2, ttl=60)
+    cache.put(1, [10])
+    cache.put(2, [20])
+    cache.get(1)
+    cache.put(3, [30])
+    assert cache.get(2) is None
+    assert cache.get(1).tolist() == [10]
+    assert cache.get(3).tolist() == [30]
+
+
+def test_seen_cache_add_only_updates_cached_users():
+    cache = SeenCache(max_size=10, ttl=60)
+    cache.put(1, [10])
+    cache.add(1, 11)
+    cache.add(2, 20)
+    assert cache.get(1).tolist() == [10, 11]
+    assert cache.get(2) is None
+
+
+def test_seen_cache_expires_entries():
+    cache = SeenCache(max_size=10, ttl=0.01)
+    cache.put(1, [10])
+    cache.put(2, [20])
+    time.sleep(0.02)
+    cache.prune()
+    assert cache.get(1) is None
+    assert cache.get(2) is None
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import cards
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cards.clear()
+    yield
+    cards.clear()
+
+
+def _profile(**overrides):
+    profile = {
+        "telegram_id": 1,
+        "university": "MIT",
+        "program": "CS",
+        "bio": "hi",
+        "photos": ["a", "b"],
+        "updated_at": datetime(2024, 1, 1),
+    }
+    profile.update(overrides)
+    return profile
+
+
+def test_same_version_is_rendered_once():
+    card = cards.render_profile_card(_profile())
+    assert cards.render_profile_card(_profile()) is card
+    assert card.strategy == cards.SEND_ALBUM
+
+
+def test_edit_renders_a_fresh_card():
+    card = cards.render_profile_card(_profile())
+    edited = cards.render_profile_card(
+        _profile(bio="new", updated_at=datetime(2024, 1, 1) + timedelta(seconds=1))
+    )
+    assert edited is not card
+    assert "new" in edited.caption
+
+
+def test_own_and_recycled_variants_are_cached_separately():
+    plain = cards.render_profile_card(_profile())
+    own = cards.render_profile_card(_profile(), own=True)
+    recycled = cards.render_profile_card(_profile(recycled=True))
+    assert len({id(plain), id(own), id(recycled)}) == 3
+    assert own.caption.startswith("👤")
+    assert recycled.caption.startswith("🔁")
+
+
+def test_evict_drops_every_variant_of_a_profile():
+    card = cards.render_profile_card(_profile())
+    cards.render_profile_card(_profile(), own=True)
+    other = cards.render_profile_card(_profile(telegram_id=2))
+    cards.evict(1)
+    assert cards.render_profile_card(_profile()) is not card
+    assert cards.render_profile_card(_profile(telegram_id=2)) is other
+
+
+def test_send_strategy_follows_photo_count():
+    assert cards.render_profile_card(_profile(photos=[])).strategy == cards.SEND_TEXT
+    assert cards.render_profile_card(_profile(telegram_id=2, photos=["a"])).strategy == cards.SEND_PHOTO
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import timedelta
+
+from config import RECYCLE_AFTER_DAYS
+from storage.memory import MemoryStorage
+
+
+def test_save_profile_rejects_stale_edit():
+    async def run():
+        storage = MemoryStorage()
+        await storage.save_profile(1, university="MIT", program="CS", bio="hi", photos=[])
+        snapshot = await storage.get_profile(1)
+
+        assert await storage.save_profile(1, bio="first", expected_updated_at=snapshot["updated_at"])
+        # The first save moved updated_at (nudged in case the clock didn't tick)
+        storage._users[1]["updated_at"] += timedelta(microseconds=1)
+        assert not await storage.save_profile(
+            1, bio="second", expected_updated_at=snapshot["updated_at"]
+        )
+        assert (await storage.get_profile(1))["bio"] == "first"
+
+    asyncio.run(run())
+
+
+def test_save_profile_without_expected_version_always_writes():
+    async def run():
+        storage = MemoryStorage()
+        await storage.save_profile(1, university="MIT")
+        assert await storage.save_profile(1, program="Physics")
+        profile = await storage.get_profile(1)
+        assert (profile["university"], profile["program"]) == ("MIT", "Physics")
+
+    asyncio.run(run())
+
+
+def test_get_profile_returns_a_copy():
+    async def run():
+        storage = MemoryStorage()
+        await storage.save_profile(1, photos=["a"])
+        (await storage.get_profile(1))["photos"].append("b")
+        assert (await storage.get_profile(1))["photos"] == ["a"]
+
+    asyncio.run(run())
+
+
+def _two_users():
+    storage = MemoryStorage()
+
+    async def setup():
+        await storage.save_profile(1, university="MIT")
+        await storage.save_profile(2, university="MIT")
+
+    asyncio.run(setup())
+    return storage
+
+
+def test_unseen_profiles_come_first():
+    storage = _two_users()
+    profile = asyncio.run(storage.get_next_profile(1))
+    assert profile["telegram_id"] == 2
+    assert not profile["recycled"]
+
+
+def test_recent_pass_is_not_recycled():
+    storage = _two_users()
+    asyncio.run(storage.record_interaction(1, 2, is_like=False))
+    assert asyncio.run(storage.get_next_profile(1)) is None
+
+
+def test_old_pass_is_recycled():
+    storage = _two_users()
+    asyncio.run(storage.record_interaction(1, 2, is_like=False))
+    storage._seen[1][2] -= timedelta(days=RECYCLE_AFTER_DAYS + 1)
+
+    profile = asyncio.run(storage.get_next_profile(1))
+    assert profile["telegram_id"] == 2
+    assert profile["recycled"]
+
+
+def test_pass_is_recycled_after_profile_update():
+    storage = _two_users()
+    asyncio.run(storage.record_interaction(1, 2, is_like=False))
+    storage._seen[1][2] -= timedelta(seconds=1)
+    asyncio.run(storage.save_profile(2, bio="new bio"))
+
+    profile = asyncio.run(storage.get_next_profile(1))
+    assert profile["telegram_id"] == 2
+    assert profile["recycled"]
+
+
+def test_likes_are_never_recycled():
+    storage = _two_users()
+    asyncio.run(storage.record_interaction(1, 2, is_like=True))
+    storage._seen[1][2] -= timedelta(days=RECYCLE_AFTER_DAYS + 1)
+    asyncio.run(storage.save_profile(2, bio="new bio"))
+
+    assert asyncio.run(storage.get_next_profile(1)) is None
+
+
+def test_mutual_like():
+    storage = _two_users()
+    asyncio.run(storage.record_interaction(1, 2, is_like=True))
+    assert not asyncio.run(storage.check_mutual_like(1, 2))
+    asyncio.run(storage.record_interaction(2, 1, is_like=True))
+    assert asyncio.run(storage.check_mutual_like(2, 1))
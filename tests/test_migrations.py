@@ -0,0 +1,17 @@
+import pytest
+
+import migrations
+
+
+def test_versions_are_increasing():
+    versions = [step.version for step in migrations.MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert versions[0] == 1
+    assert migrations.LATEST_VERSION == versions[-1]
+
+
+def test_out_of_order_registration_is_rejected():
+    count = len(migrations.MIGRATIONS)
+    with pytest.raises(ValueError):
+        migrations.migration(migrations.LATEST_VERSION, "duplicate")(lambda conn: None)
+    assert len(migrations.MIGRATIONS) == count
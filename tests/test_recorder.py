@@ -0,0 +1,109 @@
+import asyncio
+import gzip
+import json
+
+from telegram import Update
+
+from constants import BTN_SEARCH
+from recorder import UpdateRecorder
+
+_USER = {"id": 123456789, "is_bot": False, "first_name": "Ada", "last_name": "Lovelace",
+         "username": "ada"}
+_CHAT = {"id": 123456789, "type": "private", "first_name": "Ada", "username": "ada"}
+
+
+def _message(update_id: int, **fields) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {"message_id": 1, "date": 1700000000, "chat": _CHAT, "from": _USER, **fields},
+    }
+
+
+def _record(tmp_path, *updates: dict) -> list[dict]:
+    path = tmp_path / "updates.jsonl.gz"
+
+    async def run():
+        recorder = UpdateRecorder(str(path))
+        for data in updates:
+            recorder.record(Update.de_json(data, None))
+        await recorder.close()
+
+    asyncio.run(run())
+    with gzip.open(path, "rt", encoding="utf-8") as src:
+        return [json.loads(line)["update"] for line in src.readlines()[1:]]
+
+
+def _values(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _values(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _values(item)
+    else:
+        yield value
+
+
+def test_personal_data_is_removed(tmp_path):
+    contact = {"phone_number": "+15551234567", "first_name": "Bob", "user_id": 987654321}
+    (recorded,) = _record(tmp_path, _message(1, text="my secret", contact=contact))
+
+    values = set(_values(recorded))
+    for private in (123456789, 987654321, "Ada", "Lovelace", "ada", "Bob",
+                    "+15551234567", "my secret"):
+        assert private not in values
+    message = recorded["message"]
+    assert "username" not in message["from"]
+    assert message["text"] == "x" * len("my secret")
+    assert message["contact"]["phone_number"] == "x" * len("+15551234567")
+
+
+def test_ids_are_stable_within_a_recording(tmp_path):
+    first, second = _record(tmp_path, _message(1, text="a"), _message(2, text="b"))
+    assert first["message"]["from"]["id"] == second["message"]["from"]["id"]
+    assert first["message"]["from"]["id"] == first["message"]["chat"]["id"]
+
+
+def test_commands_and_buttons_are_kept(tmp_path):
+    command = _message(1, text="/start ref123",
+                       entities=[{"type": "bot_command", "offset": 0, "length": 6}])
+    button = _message(2, text=BTN_SEARCH)
+    first, second = _record(tmp_path, command, button)
+    assert first["message"]["text"] == "/start xxxxxx"
+    assert second["message"]["text"] == BTN_SEARCH
+
+
+def test_recorded_updates_still_parse(tmp_path):
+    contact = {"phone_number": "+15551234567", "first_name": "Bob", "user_id": 987654321}
+    for recorded in _record(tmp_path, _message(1, contact=contact), _message(2, text="hi")):
+        assert Update.de_json(recorded, None).effective_user is not None
+
+
+def test_locations_links_and_polls_are_masked(tmp_path):
+    venue = {
+        "location": {"latitude": 52.52, "longitude": 13.405},
+        "title": "Cafe", "address": "Unter den Linden 1", "foursquare_id": "abc",
+    }
+    poll = {
+        "id": "p1", "question": "Where do we meet?", "type": "quiz",
+        "options": [{"persistent_id": "o1", "text": "Library", "voter_count": 0}],
+        "total_voter_count": 0, "is_closed": False, "is_anonymous": True,
+        "allows_multiple_answers": False, "allows_revoting": False, "members_only": False,
+        "description": "Pick one", "explanation": "It is quiet",
+    }
+    link = _message(
+        2, text="see here",
+        entities=[{"type": "text_link", "offset": 0, "length": 3, "url": "https://me.example/ada"}],
+        link_preview_options={"url": "https://me.example/ada"},
+        reply_markup={"inline_keyboard": [[
+            {"text": "open", "web_app": {"url": "https://me.example/app"}},
+        ]]},
+    )
+    recorded = _record(tmp_path, _message(1, venue=venue), _message(3, poll=poll), link)
+
+    values = set(_values(recorded))
+    for private in (52.52, 13.405, "Unter den Linden 1", "abc", "Where do we meet?", "Pick one",
+                    "It is quiet", "https://me.example/ada", "https://me.example/app"):
+        assert private not in values
+    for data in recorded:
+        assert Update.de_json(data, None).message is not None
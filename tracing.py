@@ -0,0 +1,271 @@
+"""Per-update tracing for the Student Meetup Bot.
+
+A sampled update gets a trace with nested spans: one for handling the
+update, one per SQL statement issued through the instrumented engines and
+one per Bot API call. The current trace is carried in a context variable,
+which follows the update's task into SQLAlchemy and the Bot API request.
+
+Finished traces go to a rotating JSONL file (TRACE_FILE) or, if
+TRACE_EXPORT_URL is set, are POSTed in batches to an OTLP-style collector.
+Traces with more than TRACE_QUERY_WARN statements, or with the same
+statement repeated (a likely N+1 pattern), are flagged and logged.
+"""
+
+import json
+import logging
+import random
+import secrets
+import time
+from collections import Counter
+from collections.abc import Awaitable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+import httpx
+from telegram.request import HTTPXRequest
+
+from config import (
+    TRACE_SAMPLE_RATE, TRACE_FILE, TRACE_FILE_MAX_BYTES, TRACE_FILE_BACKUPS,
+    TRACE_EXPORT_URL, TRACE_QUERY_WARN,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# A statement executed this many times in one update is flagged as N+1
+_REPEAT_THRESHOLD = 3
+# Statements are truncated to this many characters in spans
+_MAX_STATEMENT = 300
+
+# Span kinds
+HANDLER = "handler"
+DB = "db"
+BOT_API = "bot_api"
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start", "duration", "attrs")
+
+    def __init__(self, name: str, kind: str, parent_id: str | None, attrs: dict):
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.attrs = attrs
+
+
+class Trace:
+    """All spans recorded while handling one update."""
+
+    def __init__(self, update_id: int | None):
+        self.trace_id = secrets.token_hex(16)
+        self.update_id = update_id
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: list[Span] = []
+        self.statements: Counter[str] = Counter()
+
+    def to_dict(self) -> dict:
+        query_count = sum(self.statements.values())
+        flags = []
+        if query_count > TRACE_QUERY_WARN:
+            flags.append(f"many_queries:{query_count}")
+        for statement, count in self.statements.items():
+            if count >= _REPEAT_THRESHOLD:
+                flags.append(f"n_plus_one:{count}x {statement[:80]}")
+
+        root = self.spans[0] if self.spans else None
+        return {
+            "trace_id": self.trace_id,
+            "update_id": self.update_id,
+            "started_at": self.started_at,
+            "duration_ms": round(root.duration * 1000, 3) if root else 0.0,
+            "query_count": query_count,
+            "bot_api_calls": sum(1 for span in self.spans if span.kind == BOT_API),
+            "flags": flags,
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "kind": span.kind,
+                    "offset_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    **({"attrs": span.attrs} if span.attrs else {}),
+                }
+                for span in self.spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs):
+    """Record a span under the current one, if this update is being traced."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, kind, parent.span_id if parent else None, attrs)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+
+
+def trace_update(update: object, coroutine: Awaitable[None]) -> Awaitable[None]:
+    """Wrap the processing of an update in a trace, if it's sampled."""
+    if TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE:
+        return coroutine
+    return _run_traced(update, coroutine)
+
+
+async def _run_traced(update: object, coroutine: Awaitable[None]):
+    trace = Trace(getattr(update, "update_id", None))
+    _current_trace.set(trace)
+    outcome = "ok"
+    try:
+        with span("update", HANDLER, update_type=_update_type(update)):
+            await coroutine
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        trace.spans[0].attrs["outcome"] = outcome
+        _finish(trace)
+
+
+def _update_type(update: object) -> str:
+    """Name of the populated update field (message, callback_query, ...)."""
+    for name in ("message", "edited_message", "callback_query", "my_chat_member"):
+        if getattr(update, name, None) is not None:
+            return name
+    return type(update).__name__
+
+
+def _finish(trace: Trace):
+    record = trace.to_dict()
+    if record["flags"]:
+        logger.warning(f"Update {trace.update_id}: {', '.join(record['flags'])}")
+    if _exporter is not None:
+        _exporter.export(record)
+
+
+# --- Instrumentation ---
+
+def instrument_engine(engine: "AsyncEngine"):
+    """Record a span for every statement executed on ``engine``."""
+    if TRACE_SAMPLE_RATE <= 0:
+        return
+    # Imported here so the memory backend never loads SQLAlchemy
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_trace.get() is not None:
+            conn.info.setdefault("trace_starts", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        starts = conn.info.get("trace_starts")
+        if trace is None or not starts:
+            return
+        started = starts.pop()
+        statement = " ".join(statement.split())[:_MAX_STATEMENT]
+        trace.statements[statement] += 1
+
+        parent = _current_span.get()
+        current = Span("sql", DB, parent.span_id if parent else None, {"statement": statement})
+        current.start = started
+        current.duration = time.perf_counter() - started
+        trace.spans.append(current)
+
+
+class TracingRequest(HTTPXRequest):
+    """Bot API request backend that records a span per API call."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        with span(url.rsplit("/", 1)[-1], BOT_API):
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+# --- Exporters ---
+
+class JsonlExporter:
+    """Appends traces to a size-rotated JSONL file."""
+
+    def __init__(self, path: str):
+        from logging.handlers import RotatingFileHandler
+
+        self._logger = logging.getLogger("tracing.export")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        handler = RotatingFileHandler(
+            path, maxBytes=TRACE_FILE_MAX_BYTES, backupCount=TRACE_FILE_BACKUPS
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(handler)
+
+    def export(self, record: dict):
+        self._logger.info(json.dumps(record, separators=(",", ":")))
+
+    async def flush(self):
+        pass
+
+
+class HttpExporter:
+    """Buffers traces and POSTs them in batches to a collector endpoint."""
+
+    def __init__(self, url: str, max_buffer: int = 5000):
+        self.url = url
+        self.max_buffer = max_buffer
+        self._buffer: list[dict] = []
+        self.dropped = 0
+
+    def export(self, record: dict):
+        if len(self._buffer) >= self.max_buffer:
+            # Collector unreachable for a while; don't grow without bound
+            self.dropped += 1
+            return
+        self._buffer.append(record)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.post(self.url, json={"traces": batch})
+                response.raise_for_status()
+        except httpx.HTTPError:
+            # Keep the batch for the next attempt
+            self._buffer[:0] = batch[: self.max_buffer - len(self._buffer)]
+            raise
+
+
+_exporter: JsonlExporter | HttpExporter | None = None
+
+
+def configure() -> JsonlExporter | HttpExporter | None:
+    """Set up the exporter; returns None when tracing is off."""
+    global _exporter
+    if TRACE_SAMPLE_RATE <= 0:
+        return None
+    if _exporter is None:
+        _exporter = HttpExporter(TRACE_EXPORT_URL) if TRACE_EXPORT_URL else JsonlExporter(TRACE_FILE)
+        logger.info(f"Tracing {TRACE_SAMPLE_RATE:.0%} of updates")
+    return _exporter